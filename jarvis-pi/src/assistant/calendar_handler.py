@@ -1,38 +1,69 @@
 # src/assistant/calendar_handler.py
 
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from datetime import datetime, timedelta
+# NOTE: Google API modules are imported lazily in `_ensure_service` / `get_events` -
+# they are heavy and most sessions never touch the calendar
+from datetime import datetime, time, timedelta
 from pathlib import Path
+from collections import OrderedDict
+import json
+import os
 import os.path
-import pickle
-import os.path
+import threading
+
+# Max number of (timeMin, timeMax, q, maxResults) windows kept for ETag revalidation
+EVENTS_CACHE_SIZE = 64
+
+# Start / end of day, used to build whole-day windows
+DAY_START = time.min
+DAY_END = time.max
 
 class CalendarHandler:
     def __init__(self):
         self.SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
         self.creds = None
-        self.service = None
+        self._service = None
+        # Guards authenticating and building the service, which callers on several threads may trigger at once
+        self._service_lock = threading.Lock()
+        # One authorized HTTP channel per thread, reused by its API calls (keeps the TLS connection alive);
+        # httplib2 connections are not thread-safe
+        self._http = threading.local()
+        # LRU of list-request key -> (etag, formatted events)
+        self._events_cache = OrderedDict()
+        self._events_cache_lock = threading.Lock()
         # Get the project root directory (parent of src)
         self.project_root = Path(__file__).parent.parent.parent
         
         # Define paths relative to project root
-        self.token_path = self.project_root / 'token.pickle'
+        self.token_path = self.project_root / 'token.json'
         self.secrets_path = self.project_root / 'client_secrets.json'
-
-        self._authenticate()
+    
+    @property
+    def service(self):
+        """Calendar API service, authenticated and built on first access"""
+        return self._ensure_service()
+    
+    def _ensure_service(self):
+        """Authenticate and build the Calendar API service once"""
+        if self._service is None:
+            with self._service_lock:
+                if self._service is None:
+                    self._authenticate()
+        return self._service
     
     def _authenticate(self):
         """Handle Google Calendar authentication"""
+        from google.oauth2.credentials import Credentials
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from google.auth.transport.requests import Request
+        from googleapiclient.discovery import build
+        
         # Token file stores user's access and refresh tokens
         token_file = self.token_path
         
         # Load existing credentials if available
         if os.path.exists(token_file):
-            with open(token_file, 'rb') as token:
-                self.creds = pickle.load(token)
+            info = json.loads(token_file.read_text())
+            self.creds = Credentials.from_authorized_user_info(info, self.SCOPES)
         
         # If no valid credentials available, let user log in
         if not self.creds or not self.creds.valid:
@@ -42,11 +73,12 @@ class CalendarHandler:
                 else:
                     flow = InstalledAppFlow.from_client_secrets_file(
                         self.secrets_path, self.SCOPES)
-                self.creds = flow.run_local_server(port=0)
+                    self.creds = flow.run_local_server(port=0)
             
-                # Save credentials for future use
-                with open(token_file, 'wb') as token:
-                    pickle.dump(self.creds, token)
+                # Save credentials for future use (write-then-rename so a crash never leaves a partial token)
+                tmp_file = token_file.with_suffix('.tmp')
+                tmp_file.write_text(self.creds.to_json())
+                os.replace(tmp_file, token_file)
             except Exception as e:
                 print(f"Error during authentication: {e}")
                 # Optionally, delete the token file to force re-authentication
@@ -58,7 +90,63 @@ class CalendarHandler:
                     # self._authenticate()
                 raise e
         
-        self.service = build('calendar', 'v3', credentials=self.creds)
+        # Static discovery uses the document bundled with googleapiclient - no network round-trip
+        self._service = build('calendar', 'v3', http=self._thread_http(),
+                              cache_discovery=False, static_discovery=True)
+    
+    def _thread_http(self):
+        """This thread's authorized HTTP channel for API requests, opened on first use"""
+        http = getattr(self._http, 'http', None)
+        if http is None:
+            import google_auth_httplib2
+            import httplib2
+            http = self._http.http = google_auth_httplib2.AuthorizedHttp(self.creds, http=httplib2.Http())
+        return http
+    
+    def _build_list_kwargs(self, time_min=None, time_max=None, max_results=10, query=None):
+        """Build the `events().list()` parameters for a timeframe / query"""
+        if time_min is None:
+            # TODO: update deprecated method `datetime.utcnow()`
+            # tried recommeded from error message but it still didn't work
+            # Truncated to the minute so repeated polls share an events cache key
+            time_min = datetime.utcnow().replace(second=0, microsecond=0)
+        if time_max is None:
+            time_max = time_min + timedelta(days=7)
+            
+        # Convert to RFC3339 timestamp
+        kwargs = {
+            'calendarId': 'primary',
+            'timeMin': time_min.isoformat() + 'Z',
+            'timeMax': time_max.isoformat() + 'Z',
+            'maxResults': max_results,
+            'singleEvents': True,
+            'orderBy': 'startTime'
+        }
+        # Prepare optional query parameter
+        if query:
+            kwargs['q'] = query
+        return kwargs
+    
+    def _format_event(self, event):
+        """Format a single raw API event for easy use"""
+        start = event['start']
+        end = event['end']
+        return {
+            'summary': event.get('summary', 'Untitled Event'),
+            'start': start.get('dateTime') or start.get('date'),
+            'end': end.get('dateTime') or end.get('date'),
+            'location': event.get('location', ''),
+            'description': event.get('description', ''),
+            'attendees': [
+                attendee['email']
+                for attendee in event.get('attendees') or ()
+                if 'email' in attendee
+            ]
+        }
+    
+    def _format_events(self, events_result):
+        """Format raw API events for easy use"""
+        return [self._format_event(event) for event in events_result.get('items') or ()]
     
     def get_events(self, time_min=None, time_max=None, max_results=10, query=None):
         """
@@ -66,68 +154,109 @@ class CalendarHandler:
         Returns list of events with relevant details
         """
         try:
-            if time_min is None:
-                # TODO: update deprecated method `datetime.utcnow()`
-                # tried recommeded from error message but it still didn't work
-                time_min = datetime.utcnow()
-            if time_max is None:
-                time_max = time_min + timedelta(days=7)
-                
-            # Convert to RFC3339 timestamp
-            time_min = time_min.isoformat() + 'Z'
-            time_max = time_max.isoformat() + 'Z'
+            service = self._ensure_service()
+            from googleapiclient.errors import HttpError
+            
+            kwargs = self._build_list_kwargs(time_min, time_max, max_results, query)
+            cache_key = (kwargs['timeMin'], kwargs['timeMax'], kwargs.get('q'), max_results)
+            with self._events_cache_lock:
+                cached = self._events_cache.get(cache_key)
             
-            # Prepare optional query parameter
-            kwargs = {
-                'calendarId': 'primary',
-                'timeMin': time_min,
-                'timeMax': time_max,
-                'maxResults': max_results,
-                'singleEvents': True,
-                'orderBy': 'startTime'
-            }
-            if query:
-                kwargs['q'] = query
-                
-            events_result = self.service.events().list(**kwargs).execute()
-            events = events_result.get('items', [])
+            request = service.events().list(**kwargs)
+            if cached:
+                # Conditional GET: server answers 304 with no body if nothing changed
+                request.headers['If-None-Match'] = cached[0]
+            try:
+                events_result = request.execute(http=self._thread_http())
+            except HttpError as e:
+                if cached and e.resp.status == 304:
+                    with self._events_cache_lock:
+                        if cache_key in self._events_cache:
+                            self._events_cache.move_to_end(cache_key)
+                    return cached[1]
+                raise
             
-            # Format events for easy use
-            formatted_events = []
-            for event in events:
-                start = event['start'].get('dateTime', event['start'].get('date'))
-                end = event['end'].get('dateTime', event['end'].get('date'))
-                
-                formatted_events.append({
-                    'summary': event.get('summary', 'Untitled Event'),
-                    'start': start,
-                    'end': end,
-                    'location': event.get('location', ''),
-                    'description': event.get('description', ''),
-                    'attendees': [
-                        attendee['email'] 
-                        for attendee in event.get('attendees', [])
-                        if 'email' in attendee
-                    ]
-                })
-                
+            formatted_events = self._format_events(events_result)
+            self._cache_events(cache_key, events_result.get('etag'), formatted_events)
             return formatted_events
             
         except Exception as e:
             print(f"Error fetching calendar events: {e}")
             return None
     
+    def _cache_events(self, cache_key, etag, formatted_events):
+        """Remember a list response for ETag revalidation, evicting the least recently used"""
+        if not etag:
+            return
+        with self._events_cache_lock:
+            self._events_cache[cache_key] = (etag, formatted_events)
+            self._events_cache.move_to_end(cache_key)
+            while len(self._events_cache) > EVENTS_CACHE_SIZE:
+                self._events_cache.popitem(last=False)
+    
+    def get_events_batch(self, param_sets):
+        """
+        Fetch several event lists in a single batched HTTP round-trip
+        `param_sets` is a list of `get_events` keyword dicts
+        Returns a list of formatted event lists (None for a failed sub-request), in input order
+        """
+        results = [None] * len(param_sets)
+        
+        def _callback(request_id, response, exception):
+            if exception is not None:
+                print(f"Error fetching calendar events: {exception}")
+                return
+            results[int(request_id)] = self._format_events(response)
+        
+        try:
+            service = self._ensure_service()
+            batch = service.new_batch_http_request(callback=_callback)
+            for i, params in enumerate(param_sets):
+                kwargs = self._build_list_kwargs(**params)
+                batch.add(service.events().list(**kwargs), request_id=str(i))
+            batch.execute(http=self._thread_http())
+        except Exception as e:
+            print(f"Error fetching calendar events: {e}")
+        return results
+    
     def get_next_event(self):
         """Get the next upcoming event"""
         events = self.get_events(max_results=1)
         return events[0] if events else None
     
+    def describe_event(self, event):
+        """Speakable one-line description of a formatted event, e.g. 'Standup on Monday at 09:30 AM'"""
+        start = event['start']
+        if 'T' not in start:
+            # All-day event - date only
+            when = datetime.strptime(start, '%Y-%m-%d').strftime('on %A, %B %d')
+        else:
+            when = datetime.fromisoformat(start.replace('Z', '+00:00')).strftime('on %A, %B %d at %I:%M %p')
+        description = f"{event['summary']} {when}"
+        if event['location']:
+            description += f" at {event['location']}"
+        return description
+    
     def get_events_for_date(self, date):
-        """Get all events for a specific date"""
-        start = datetime.combine(date, datetime.min.time())
-        end = datetime.combine(date, datetime.max.time())
+        """
+        Get all events for a specific date
+        Pass a list of dates to fetch them all in one batched request
+        """
+        if isinstance(date, (list, tuple)):
+            return self.get_events_batch([
+                {'time_min': datetime.combine(d, DAY_START),
+                 'time_max': datetime.combine(d, DAY_END)}
+                for d in date
+            ])
+        start = datetime.combine(date, DAY_START)
+        end = datetime.combine(date, DAY_END)
         return self.get_events(time_min=start, time_max=end)
     
     def search_events(self, query):
-        """Search for events matching the query"""
-        return self.get_events(query=query)
\ No newline at end of file
+        """
+        Search for events matching the query
+        Pass a list of queries to run them all in one batched request
+        """
+        if isinstance(query, (list, tuple)):
+            return self.get_events_batch([{'query': q} for q in query])
+        return self.get_events(query=query)
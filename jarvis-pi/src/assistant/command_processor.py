@@ -1,86 +1,334 @@
 # src/assistant/command_processor.py
 
-import json
 import logging
-from openai import OpenAI
-from typing import Dict, List, Tuple
+try:
+    # C-accelerated parser for action requests, when available
+    import orjson as json_parser
+except ImportError:
+    import json as json_parser
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
 import time
+from assistant.openai_client import get_openai_client
+from assistant.response_cache import ExactResponseCache, SemanticResponseCache
 from assistant.tooling.tooling_manager import ToolingManager
+from utils.system_utils import basic_command_reply
 
 MODEL = "gpt-4-turbo-preview"
 # MODEL = "gpt-4o-mini" # Not as good at returning action requests
+FAST_MODEL = "gpt-4o-mini"
+
+# Race FAST_MODEL against MODEL for likely action requests, taking the first valid action request.
+# Doubles spend on those turns, so off by default.
+RACE_ACTION_MODELS = False
+# Requests likely to need a system action - the only ones worth racing
+ACTION_LIKELY_PATTERN = re.compile(r"\b(?:time|date|calendar|event|meeting|schedule|system|cpu|memory|process|news|location)", re.IGNORECASE)
+
+# Whitespace following sentence-ending punctuation - where streamed text is handed to TTS
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+# Unpunctuated streamed text is handed to TTS anyway once it grows past this many words
+MAX_PENDING_WORDS = 80
+
+# An action request reply starts with one of these - anything else is prose
+JSON_PREFIXES = ("{", "```json")
+
+# Max concurrent AI requests when processing a batch of commands
+MAX_BULK_WORKERS = 8
+# Max commands started per minute when processing batches, to stay under the API key's rate limit
+BULK_REQUESTS_PER_MINUTE = 40
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per `period` seconds, bursting up to `rate` at once"""
+    def __init__(self, rate: float, period: float = 60.0):
+        self.capacity = rate
+        self.refill_rate = rate / period
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take a token, waiting for one to refill if the bucket is empty"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.refill_rate
+            time.sleep(delay)
 
 class CommandProcessor:
     def __init__(self):
-        self.client = OpenAI()
+        self.client = get_openai_client()
         self.tooling_manager = ToolingManager()
+        # Replies to earlier identical / paraphrased requests that needed no system action
+        self.exact_cache = ExactResponseCache(MODEL)
+        self.response_cache = SemanticResponseCache()
+        # Runs system actions so they can start while the AI reply is still streaming
+        self._action_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="action")
+        # Runs the racing model requests, one per model
+        self._race_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="race")
+        # Paces batch commands across every process_commands_bulk call
+        self._bulk_rate_limiter = RateLimiter(BULK_REQUESTS_PER_MINUTE)
 
-    def _get_ai_response(self, messages: List[Dict], max_tokens: int = 150, temperature: float = 0.7) -> str:
+    def _get_ai_response(self, messages: List[Dict], max_tokens: int = 150, temperature: float = 0.7,
+                         model: str = MODEL) -> str:
         """Get completion from AI provider"""
         try:
             response = self.client.chat.completions.create(
-                model=MODEL,
+                model=model,
                 messages=messages,
                 max_tokens=max_tokens,
                 temperature=temperature
             )
-            print(f"🔍 OpenAI response: {response.choices[0].message.content}")
+            logging.debug("🔍 OpenAI response: %s", response.choices[0].message.content)
             return response.choices[0].message.content
         except Exception as e:
             logging.error(f"Error getting completion: {str(e)}")
             raise
-        
 
-    def process_command(self, text: str, context: List[Tuple[str, str, str]]) -> str:
-        """Process user command with context awareness"""
-        print(f"🔍 Processing command: {text}")
+    def _stream_ai_response(self, messages: List[Dict], on_sentence: Callable[[str], None],
+                            max_tokens: int = 150, temperature: float = 0.7,
+                            on_action: Optional[Callable[[Dict], None]] = None) -> Tuple[str, bool]:
+        """
+        Stream completion from AI provider, handing prose to `on_sentence` one sentence at a time.
+        Replies that look like a JSON action request are only buffered; `on_action` (if given)
+        receives the action request as soon as it is complete, before the stream ends.
+        Returns the full text and whether it was handed to `on_sentence`.
+        """
+        try:
+            stream = self.client.chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True
+            )
+            parts = []
+            pending = ""
+            is_prose = None
+            action_sent = False
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                parts.append(delta)
+
+                if is_prose is None:
+                    head = "".join(parts).lstrip()
+                    # Undecided until the reply can no longer turn into a ```json fence
+                    if not head or JSON_PREFIXES[1].startswith(head):
+                        continue
+                    is_prose = not head.startswith(JSON_PREFIXES)
+                    pending = head
+                elif is_prose:
+                    pending += delta
+
+                if is_prose:
+                    *sentences, pending = SENTENCE_BOUNDARY.split(pending)
+                    for sentence in sentences:
+                        on_sentence(sentence)
+                    # Long run-on text - speak what we have up to the last complete word
+                    if pending.count(" ") >= MAX_PENDING_WORDS:
+                        spoken_part, _, pending = pending.rpartition(" ")
+                        on_sentence(spoken_part)
+                elif on_action is not None and not action_sent and "}" in delta:
+                    action_request = self._parse_action_request("".join(parts))
+                    if action_request is not None:
+                        action_sent = True
+                        on_action(action_request)
+
+            if is_prose and pending.strip():
+                on_sentence(pending)
+
+            response_text = "".join(parts)
+            logging.debug("🔍 OpenAI response: %s", response_text)
+            return response_text, bool(is_prose)
+        except Exception as e:
+            logging.error(f"Error getting completion: {str(e)}")
+            raise
+
+    def _race_ai_response(self, messages: List[Dict]) -> str:
+        """
+        Request a completion from FAST_MODEL and MODEL at once
+        Returns the first reply that is a valid action request, otherwise MODEL's reply.
+        """
+        default_future = self._race_executor.submit(self._get_ai_response, messages, model=MODEL)
+        fast_future = self._race_executor.submit(self._get_ai_response, messages, model=FAST_MODEL)
+        pending = {default_future, fast_future}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None and self._parse_action_request(future.result()) is not None:
+                    logging.debug("🔍 Race won by %s", MODEL if future is default_future else FAST_MODEL)
+                    # An in-flight request can't be interrupted, its reply is just ignored
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+        return default_future.result()
+
+    def _parse_action_request(self, text: str) -> Optional[Dict]:
+        """Parse a complete action request out of a (possibly still streaming) reply"""
+        start = text.find("{")
+        end = text.rfind("}")
+        if start == -1 or end < start:
+            return None
+        try:
+            action_request = json_parser.loads(text[start:end + 1])
+        except ValueError:
+            return None
+        return action_request if isinstance(action_request, dict) and "action" in action_request else None
+
+    def _respond(self, messages: List[Dict], on_sentence: Optional[Callable[[str], None]]) -> str:
+        """Get a natural language response, streaming it to `on_sentence` if given"""
+        if on_sentence is None:
+            return self._get_ai_response(messages)
+        response_text, spoken = self._stream_ai_response(messages, on_sentence)
+        return response_text if spoken else self._deliver(response_text, on_sentence)
+
+    def _deliver(self, response: str, on_sentence: Optional[Callable[[str], None]]) -> str:
+        """Hand a complete response to `on_sentence` (if given) and return it"""
+        if on_sentence is not None:
+            on_sentence(response)
+        return response
+
+    def _cache_response(self, text: str, context: List[Tuple[str, str, str]], response: str) -> None:
+        """Remember a prose reply for repeated requests"""
+        self.exact_cache.put(text, context, response)
+        self.response_cache.put(text, context, response)
+
+    def _run_action(self, action_request: Dict, messages: List[Dict],
+                    on_sentence: Optional[Callable[[str], None]],
+                    started_action: Optional[Future] = None) -> str:
+        """
+        Execute a system action and respond with its result
+        `started_action` is the same action already running on the action executor, if any
+        """
+        logging.debug("🔍 Found action request: '%s'", action_request['action'])
+
+        # Execute system action (or collect the result of the one already running)
+        if started_action is not None:
+            action_result = started_action.result()
+        else:
+            action_result = self.tooling_manager.execute_system_action(action_request)
+        result = action_result.get("result")
+        send_direct = action_result.get("send_direct")
+
+        logging.debug("🔍 Action result: %s, Direct Response?: %s", result, send_direct)
+
+        if send_direct:
+            # TODO - something seems to be cutting off the beginning of the response
+            # time.sleep(0.4)
+            return self._deliver(result, on_sentence)
+
+        # Sent as a user turn - a mid-conversation system message would split the cached system prefix
+        messages.append({
+            "role": "user",
+            "content": f"Action result: {result}. Provide a natural language response."
+        })
+
+        # Get final AI response
+        return self._respond(messages, on_sentence)
+
+    def process_command(self, text: str, context: List[Tuple[str, str, str]],
+                        on_sentence: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Process user command with context awareness
+        If `on_sentence` is given, the response is also handed to it as it becomes available,
+        sentence by sentence for streamed replies, so speech can start before the reply is complete.
+        """
+        logging.debug("🔍 Processing command: %s", text)
+
+        # Basic commands are answered locally, no AI round-trip
+        basic_reply = basic_command_reply(text.strip().lower())
+        if basic_reply is not None:
+            return self._deliver(basic_reply, on_sentence)
 
         try:
             # Format messages based on provider
             messages = self.tooling_manager.format_messages_for_openai(text, context)
-            
-            print(f"🔍 Getting AI response")
+
+            # Obvious action requests skip the AI call that would only produce the action JSON
+            action_request = self.tooling_manager.detect_fast_intent(text)
+            if action_request is not None:
+                return self._run_action(action_request, messages, on_sentence)
+
+            # Repeated request - reuse the earlier reply
+            cached_response = self.exact_cache.get(text, context)
+            if cached_response is None:
+                cached_response = self.response_cache.get(text, context)
+            if cached_response is not None:
+                logging.debug("🔍 Cached response: %s", cached_response)
+                return self._deliver(cached_response, on_sentence)
+
+            # Action started while the reply was still streaming: (action request, future)
+            early_action = []
+
+            def start_action(request: Dict) -> None:
+                future = self._action_executor.submit(self.tooling_manager.execute_system_action, request)
+                early_action.append((request, future))
+
+            logging.debug("🔍 Getting AI response")
             # Get initial response
-            response_text = self._get_ai_response(messages)
-            
-            print(f"🔍 Attempting to extract JSON from response")
+            if RACE_ACTION_MODELS and ACTION_LIKELY_PATTERN.search(text):
+                response_text = self._race_ai_response(messages)
+            elif on_sentence is None:
+                response_text = self._get_ai_response(messages)
+            else:
+                response_text, spoken = self._stream_ai_response(messages, on_sentence, on_action=start_action)
+                if spoken:
+                    self._cache_response(text, context, response_text)
+                    return response_text
+
+            # Skip JSON extraction/parsing for plain prose replies
+            if not response_text.lstrip().startswith(JSON_PREFIXES):
+                self._cache_response(text, context, response_text)
+                return self._deliver(response_text, on_sentence)
+
+            logging.debug("🔍 Attempting to extract JSON from response")
             json_or_str_response = self.tooling_manager.extract_json_from_str(response_text)
-            
+
             # Try to parse as JSON action request
             try:
-                print(f"🔍 Attempting to parse JSON action request")
-                action_request = json.loads(json_or_str_response)
-                print(f"🔍 Action request: {action_request}")
-                
-                if "action" in action_request:
-                    print(f"🔍 Found action request: '{action_request['action']}'")
-                    
-                    # Execute system action
-                    action_result = self.tooling_manager.execute_system_action(action_request)
-                    result = action_result.get("result")
-                    send_direct = action_result.get("send_direct")
-                    
-                    print(f"🔍 Action result: {result}, Direct Response?: {send_direct}")
-                    
-                    if send_direct:
-                        # TODO - something seems to be cutting off the beginning of the response
-                        # time.sleep(0.4)
-                        return result
-                    
-                    messages.append({"role": "assistant", "content": response_text})
-                    messages.append({
-                        "role": "system",
-                        "content": f"Action result: {result}. Provide a natural language response."
-                    })
-                    
-                    # Get final AI response
-                    return self._get_ai_response(messages)
-                
-            except json.JSONDecodeError:
-                print("↘️ Not a JSON response, returning as is")
+                logging.debug("🔍 Attempting to parse JSON action request")
+                action_request = json_parser.loads(json_or_str_response)
+            # Both json and orjson decode errors are ValueErrors
+            except ValueError:
+                logging.debug("↘️ Not a JSON response, returning as is")
                 # Not a JSON response, return as is
-                return response_text
-                
+                self._cache_response(text, context, response_text)
+                return self._deliver(response_text, on_sentence)
+
+            logging.debug("🔍 Action request: %s", action_request)
+            if "action" in action_request:
+                messages.append({"role": "assistant", "content": response_text})
+                started_action = None
+                if early_action and early_action[0][0] == action_request:
+                    started_action = early_action[0][1]
+                return self._run_action(action_request, messages, on_sentence, started_action)
+
         except Exception as e:
             logging.error(f"Error processing command: {str(e)}")
-            return "Didn't catch that."
\ No newline at end of file
+            return self._deliver("Didn't catch that.", on_sentence)
+
+    def process_commands_bulk(self, items: List[Tuple[str, List[Tuple[str, str, str]]]],
+                              max_workers: int = MAX_BULK_WORKERS) -> List[str]:
+        """
+        Process several independent (text, context) commands concurrently
+        Requests overlap on the shared connection pool instead of running back to back,
+        started no faster than BULK_REQUESTS_PER_MINUTE.
+        Returns the responses in input order.
+        """
+        if not items:
+            return []
+
+        def _process(item):
+            self._bulk_rate_limiter.acquire()
+            return self.process_command(*item)
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items)), thread_name_prefix="bulk") as executor:
+            return list(executor.map(_process, items))
@@ -0,0 +1,56 @@
+# src/assistant/embedding_model.py
+
+import logging
+import platform
+import threading
+from typing import TYPE_CHECKING, Dict
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+DEFAULT_EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+
+# Int8-quantized ONNX exports published alongside the model, by CPU architecture
+ONNX_INT8_FILES = {
+    'aarch64': 'onnx/model_qint8_arm64.onnx',
+    'arm64': 'onnx/model_qint8_arm64.onnx',
+    'x86_64': 'onnx/model_quint8_avx2.onnx',
+    'AMD64': 'onnx/model_quint8_avx2.onnx',
+}
+
+# Loaded models by name, shared by every caller
+_models: Dict[str, "SentenceTransformer"] = {}
+_models_lock = threading.Lock()
+
+def get_embedding_model(name: str = DEFAULT_EMBEDDING_MODEL) -> "SentenceTransformer":
+    """
+    Get the process-wide sentence transformer model.
+    The reply cache and the memory stores share one copy of the weights instead of each loading their own.
+    """
+    with _models_lock:
+        if name not in _models:
+            _models[name] = _load_model(name)
+        return _models[name]
+
+def _load_model(name: str) -> "SentenceTransformer":
+    """
+    Load a model on ONNX Runtime with int8 weights if possible (needs `optimum[onnxruntime]`),
+    otherwise on PyTorch with int8 dynamic quantization of its Linear layers
+    """
+    # Imported on first use - torch is slow to load on the Pi
+    from sentence_transformers import SentenceTransformer
+    
+    file_name = ONNX_INT8_FILES.get(platform.machine())
+    if file_name is not None:
+        try:
+            return SentenceTransformer(name, backend="onnx", model_kwargs={"file_name": file_name})
+        except Exception as e:
+            logging.info(f"ONNX embedding model unavailable, using PyTorch: {e}")
+    
+    model = SentenceTransformer(name, device="cpu")
+    try:
+        import torch
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    except Exception as e:
+        logging.error(f"Error quantizing embedding model: {e}")
+    return model
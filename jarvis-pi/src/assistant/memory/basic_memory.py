@@ -1,23 +1,42 @@
 import sqlite3
 import logging
+import time
 from datetime import datetime
-from threading import Lock, RLock
+from threading import Lock, RLock, local
 from contextlib import contextmanager
 
+def _to_datetime(timestamp_ms):
+    """Stored epoch milliseconds -> the local datetime string interactions were returned with before"""
+    return str(datetime.fromtimestamp(timestamp_ms / 1000))
+
 class BasicMemory:
     def __init__(self, db_path="semantic_memory.db"):
         """Initialize SQLite memory system"""
         self.db_path = db_path
         self.write_lock = Lock()
         self.read_lock = RLock()
+        # One connection per thread, kept open for the life of the thread
+        self._local = local()
+        # Whether the full-text index is available (needs SQLite built with FTS5)
+        self.fts_enabled = False
         self.setup_database()
 
+    def _connection(self):
+        """This thread's database connection, opened on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            # Safe with WAL - only the last commits can be lost on power failure, never corrupted
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
     @contextmanager
     def get_db_connection(self, for_writing=False):
         """Thread-safe database connection manager"""
         lock = self.write_lock if for_writing else self.read_lock
         with lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connection()
             try:
                 yield conn
                 if for_writing:
@@ -26,13 +45,13 @@ class BasicMemory:
                 if for_writing:
                     conn.rollback()
                 raise e
-            finally:
-                conn.close()
 
     def setup_database(self):
         """Create the interactions table if it doesn't exist"""
         try:
-            with self.get_db_connection() as conn:
+            with self.get_db_connection(for_writing=True) as conn:
+                # Write-ahead log: readers don't block on writes, and a commit is a single append
+                conn.execute('PRAGMA journal_mode=WAL')
                 cursor = conn.cursor()
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS interactions (
@@ -40,11 +59,66 @@ class BasicMemory:
                         user_id TEXT,
                         user_message TEXT,
                         assistant_response TEXT,
-                        timestamp DATETIME
+                        timestamp INTEGER NOT NULL
                     )
                 ''')
+                # Interactions stored before timestamps were epoch milliseconds hold local datetime text
+                cursor.execute('''
+                    UPDATE interactions
+                    SET timestamp = CAST(ROUND((julianday(timestamp, 'utc') - 2440587.5) * 86400000) AS INTEGER)
+                    WHERE typeof(timestamp) = 'text'
+                ''')
+                # Recent-history reads walk this index instead of sorting the whole table
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_interactions_timestamp
+                    ON interactions(timestamp)
+                ''')
         except sqlite3.Error as e:
             logging.error(f"Database setup error: {e}")
+        self.setup_full_text_index()
+
+    def setup_full_text_index(self):
+        """
+        Create a trigram full-text index over interactions, kept in sync by triggers
+        Trigrams match any substring of 3+ characters, like LIKE '%query%', without scanning the table
+        """
+        try:
+            with self.get_db_connection(for_writing=True) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'interactions_fts'")
+                exists = cursor.fetchone() is not None
+                cursor.execute('''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS interactions_fts USING fts5(
+                        user_message, assistant_response,
+                        content='interactions', content_rowid='id', tokenize='trigram'
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE TRIGGER IF NOT EXISTS interactions_fts_insert AFTER INSERT ON interactions BEGIN
+                        INSERT INTO interactions_fts(rowid, user_message, assistant_response)
+                        VALUES (new.id, new.user_message, new.assistant_response);
+                    END
+                ''')
+                cursor.execute('''
+                    CREATE TRIGGER IF NOT EXISTS interactions_fts_delete AFTER DELETE ON interactions BEGIN
+                        INSERT INTO interactions_fts(interactions_fts, rowid, user_message, assistant_response)
+                        VALUES ('delete', old.id, old.user_message, old.assistant_response);
+                    END
+                ''')
+                cursor.execute('''
+                    CREATE TRIGGER IF NOT EXISTS interactions_fts_update AFTER UPDATE ON interactions BEGIN
+                        INSERT INTO interactions_fts(interactions_fts, rowid, user_message, assistant_response)
+                        VALUES ('delete', old.id, old.user_message, old.assistant_response);
+                        INSERT INTO interactions_fts(rowid, user_message, assistant_response)
+                        VALUES (new.id, new.user_message, new.assistant_response);
+                    END
+                ''')
+                if not exists:
+                    # Index interactions stored before the index existed
+                    cursor.execute("INSERT INTO interactions_fts(interactions_fts) VALUES ('rebuild')")
+            self.fts_enabled = True
+        except sqlite3.Error as e:
+            logging.error(f"Full-text index unavailable, searching without it: {e}")
 
     def add_interaction(self, user_id, user_message, assistant_response):
         """Store a new interaction in the database"""
@@ -55,12 +129,12 @@ class BasicMemory:
                     INSERT INTO interactions 
                     (user_id, user_message, assistant_response, timestamp)
                     VALUES (?, ?, ?, ?)
-                ''', (user_id, user_message, assistant_response, datetime.now()))
+                ''', (user_id, user_message, assistant_response, int(time.time() * 1000)))
         except sqlite3.Error as e:
             logging.error(f"Error adding interaction: {e}")
 
     def get_recent_interactions(self, limit=5):
-        """Get the most recent interactions"""
+        """Get the most recent interactions, oldest first (conversation order)"""
         try:
             with self.get_db_connection(for_writing=False) as conn:
                 cursor = conn.cursor()
@@ -70,7 +144,10 @@ class BasicMemory:
                     ORDER BY timestamp DESC 
                     LIMIT ?
                 ''', (limit,))
-                return cursor.fetchall()
+                return [
+                    (user_message, assistant_response, _to_datetime(timestamp))
+                    for user_message, assistant_response, timestamp in reversed(cursor.fetchall())
+                ]
         except sqlite3.Error as e:
             logging.error(f"Error retrieving interactions: {e}")
             return []
@@ -80,13 +157,26 @@ class BasicMemory:
         try:
             with self.get_db_connection(for_writing=False) as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT user_message, assistant_response, timestamp 
-                    FROM interactions 
-                    WHERE user_message LIKE ? OR assistant_response LIKE ?
-                    ORDER BY timestamp DESC
-                ''', (f'%{query}%', f'%{query}%'))
-                return cursor.fetchall()
+                # Trigrams can't match queries shorter than 3 characters
+                if self.fts_enabled and len(query) >= 3:
+                    cursor.execute('''
+                        SELECT i.user_message, i.assistant_response, i.timestamp 
+                        FROM interactions_fts f 
+                        JOIN interactions i ON i.id = f.rowid 
+                        WHERE interactions_fts MATCH ? 
+                        ORDER BY i.timestamp DESC
+                    ''', ('"{}"'.format(query.replace('"', '""')),))
+                else:
+                    cursor.execute('''
+                        SELECT user_message, assistant_response, timestamp 
+                        FROM interactions 
+                        WHERE user_message LIKE ? OR assistant_response LIKE ?
+                        ORDER BY timestamp DESC
+                    ''', (f'%{query}%', f'%{query}%'))
+                return [
+                    (user_message, assistant_response, _to_datetime(timestamp))
+                    for user_message, assistant_response, timestamp in cursor.fetchall()
+                ]
         except sqlite3.Error as e:
             logging.error(f"Error searching interactions: {e}")
             return []
@@ -1,14 +1,72 @@
-from typing import List, Dict, Optional, Any, Set
+from typing import List, Dict, Optional, Any, Set, Tuple
+import atexit
+import hashlib
+import logging
+import queue
 import sqlite3
+import threading
 from datetime import datetime, timedelta
 import time
 from dataclasses import dataclass
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import re
-from collections import Counter
-import json
-from assistant.memory.semantic_memory_store import SemanticMemoryStore
+from collections import Counter, OrderedDict
+from assistant.memory.ltm_stm_system.semantic_memory_store import SemanticMemoryStore, _dumps
+
+# Interaction tables schema version, kept in PRAGMA user_version
+# 1: covering (user_id, interaction_id) index on recent_contexts
+SCHEMA_VERSION = 1
+
+# Max memories the background writer stores per batch (one encode), and how long it waits to fill one (seconds)
+MEMORY_BATCH_SIZE = 32
+MEMORY_BATCH_WAIT = 0.005
+# Max interaction embeddings kept for reuse (relevance detection, then again at session end)
+EMBEDDING_CACHE_SIZE = 4096
+
+# Topics worth remembering - interactions close to one of them are relevant
+IMPORTANT_TOPICS = [
+    "personal preferences and likes",
+    "health, allergies and medical conditions",
+    "family, friends and pets",
+    "work, job and projects",
+    "important dates, appointments and deadlines",
+    "names and how to address the user",
+    "skills and experience",
+    "corrections to something said earlier"
+]
+# Min similarity to the closest important topic for HIGH / MEDIUM relevance
+HIGH_RELEVANCE_SIMILARITY = 0.5
+MEDIUM_RELEVANCE_SIMILARITY = 0.35
+# User messages that are always worth remembering - explicit requests, corrections, facts about the user
+CRITICAL_PATTERN = re.compile(
+    r"\b(?:remember (?:this|that)|don'?t forget|keep in mind|my name is|call me|i(?:'m| am) allergic"
+    r"|that'?s (?:wrong|not right)|correction)\b",
+    re.IGNORECASE
+)
+# User messages never worth remembering - greetings and acknowledgments on their own
+IGNORE_PATTERN = re.compile(
+    r"(?:hi|hello|hey|thanks|thank you|ok(?:ay)?|sure|yes|yeah|no|nope|bye|goodbye|good (?:morning|night))"
+    r"(?: jarvis)?[\s.,!?]*",
+    re.IGNORECASE
+)
+# Interactions shorter than this (characters, both sides combined) are ignored outright
+MIN_RELEVANT_LENGTH = 4
+
+# Keywords suggesting each memory category
+CATEGORY_PATTERNS = {
+    'preferences': [r'prefer', r'like', r'enjoy', r'rather', r'instead'],
+    'personal': [r'name', r'age', r'live', r'family', r'job', r'work'],
+    'health': [r'allerg', r'health', r'medical', r'condition', r'medication'],
+    'skills': [r'can', r'know how', r'able to', r'experience', r'skilled'],
+    'facts': [r'fact', r'true', r'always', r'never', r'must']
+}
+# All category keywords as one alternation, one named group per keyword, scanned in a single pass
+_CATEGORY_KEYWORDS = [(category, pattern) for category, patterns in CATEGORY_PATTERNS.items() for pattern in patterns]
+CATEGORY_GROUPS = {f"g{i:02d}": category for i, (category, _) in enumerate(_CATEGORY_KEYWORDS)}
+CATEGORY_PATTERN = re.compile(
+    "|".join(f"(?P<g{i:02d}>{pattern})" for i, (_, pattern) in enumerate(_CATEGORY_KEYWORDS)),
+    re.IGNORECASE
+)
 
 @dataclass
 class Relevance:
@@ -29,12 +87,29 @@ class IntegratedMemorySystem:
         """
         self.semantic_memory_store = SemanticMemoryStore()
         self.conn = sqlite3.connect(db_path)
+        if db_path != ':memory:':
+            # Write-ahead log with NORMAL sync - an interaction insert no longer waits on a disk sync
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
         self._create_tables()
-        # Load model for importance detection
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        # Model for importance detection - the semantic store's, not a second copy
+        self.model = self.semantic_memory_store.model
+        # The topics never change - encode them once, not per interaction
+        self._topic_embeddings = self.model.encode(IMPORTANT_TOPICS, normalize_embeddings=True).astype(np.float32)
+        # Interaction embeddings by content digest, least recently used first
+        self._embedding_cache = OrderedDict()
+        self._embedding_cache_lock = threading.Lock()
+        # Memories waiting for the background writer, so callers never block on encoding
+        self._pending_memories = queue.Queue()
+        threading.Thread(target=self._store_pending_memories, name="memory-writer", daemon=True).start()
+        # Queued memories would be lost with the daemon writer at shutdown
+        atexit.register(self.flush)
         
     def _create_tables(self):
-        """Create necessary tables in the SQLite database."""
+        """Create necessary tables in the SQLite database, unless the schema is already current."""
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
         with self.conn:
             self.conn.execute('''
                 CREATE TABLE IF NOT EXISTS interactions (
@@ -55,6 +130,13 @@ class IntegratedMemorySystem:
                     FOREIGN KEY(interaction_id) REFERENCES interactions(id)
                 )
             ''')
+            # Session lookups / cleanup are by user; covering, so the interaction ids come from the index alone
+            self.conn.execute('DROP INDEX IF EXISTS idx_recent_contexts_user')
+            self.conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_recent_contexts_user_interaction
+                ON recent_contexts(user_id, interaction_id)
+            ''')
+            self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
 
     def add_interaction(self, 
                        user_id: str,
@@ -66,10 +148,9 @@ class IntegratedMemorySystem:
         Store a conversation interaction, automatically detecting relevance if not provided.
         """
         # Auto-detect relevance if not provided
+        embedding = None
         if relevance is None:
-            # TODO: implement relevance detection
-            # relevance = self._detect_relevance(user_message, assistant_response)
-            relevance = Relevance.MEDIUM
+            relevance, embedding = self._detect_relevance(user_message, assistant_response)
             
         timestamp = time.time()
         interaction = {
@@ -77,7 +158,7 @@ class IntegratedMemorySystem:
             'relevance': relevance,
             'user_message': user_message,
             'assistant_response': assistant_response,
-            'metadata': json.dumps(metadata or {})
+            'metadata': _dumps(metadata or {})
         }
         
         # Store in SQLite
@@ -96,120 +177,164 @@ class IntegratedMemorySystem:
         
         # If critical or high relevance, extract and store immediately
         if relevance >= Relevance.HIGH:
-            self._extract_and_store_semantic_memory(user_id, interaction)
+            self._extract_and_store_semantic_memory(user_id, interaction, embedding)
+
+    def _detect_relevance(self, user_message: str, assistant_response: str) -> Tuple[float, Optional[np.ndarray]]:
+        """
+        Detect how relevant an interaction is to remember, by its similarity to the important topics.
+        Also returns the interaction's embedding (in memory content form) for reuse when it's stored.
+        Messages matching CRITICAL_PATTERN / IGNORE_PATTERN are decided without encoding (embedding None).
+        """
+        message = user_message.strip()
+        if len(message) + len(assistant_response.strip()) < MIN_RELEVANT_LENGTH:
+            return Relevance.IGNORE, None
+        if CRITICAL_PATTERN.search(message):
+            return Relevance.CRITICAL, None
+        if IGNORE_PATTERN.fullmatch(message):
+            return Relevance.IGNORE, None
+        
+        embedding = self._encode([f"User: {user_message}\nAssistant: {assistant_response}"])[0]
+        
+        similarity = float((self._topic_embeddings @ embedding).max())
+        if similarity >= HIGH_RELEVANCE_SIMILARITY:
+            return Relevance.HIGH, embedding
+        if similarity >= MEDIUM_RELEVANCE_SIMILARITY:
+            return Relevance.MEDIUM, embedding
+        return Relevance.LOW, embedding
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """
+        L2-normalized float32 embeddings of `texts`, one row per text.
+        Texts encoded before (e.g. an interaction at relevance detection) come from the cache, the rest in one batch.
+        """
+        keys = [hashlib.blake2b(text.encode(), digest_size=16).digest() for text in texts]
+        embeddings = [None] * len(texts)
+        with self._embedding_cache_lock:
+            for i, key in enumerate(keys):
+                embedding = self._embedding_cache.get(key)
+                if embedding is not None:
+                    self._embedding_cache.move_to_end(key)
+                    embeddings[i] = embedding
+        
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            encoded = self.model.encode(
+                [texts[i] for i in missing],
+                batch_size=32,
+                normalize_embeddings=True
+            ).astype(np.float32)
+            with self._embedding_cache_lock:
+                for i, embedding in zip(missing, encoded):
+                    embeddings[i] = embedding
+                    self._embedding_cache[keys[i]] = embedding
+                while len(self._embedding_cache) > EMBEDDING_CACHE_SIZE:
+                    self._embedding_cache.popitem(last=False)
+        return np.stack(embeddings)
 
     def end_session(self, user_id: str) -> None:
         """
         End a conversation session, processing all context for long-term storage.
         """
-        # Get all interactions for this user
-        with self.conn:
-            interaction_ids = self.conn.execute('''
-                SELECT interaction_id FROM recent_contexts WHERE user_id = ?
-            ''', (user_id,)).fetchall()
+        # Get all interactions for this user, in one query, most relevant first.
+        # Only the columns session processing reads - no per-row metadata parsing.
+        rows = self.conn.execute('''
+            SELECT i.relevance, i.user_message, i.assistant_response
+            FROM recent_contexts rc
+            JOIN interactions i ON i.id = rc.interaction_id
+            WHERE rc.user_id = ?
+            ORDER BY i.relevance DESC, i.id
+        ''', (user_id,)).fetchall()
         
-        interactions = []
-        for (interaction_id,) in interaction_ids:
-            data = self.conn.execute('''
-                SELECT * FROM interactions WHERE id = ?
-            ''', (interaction_id,)).fetchone()
-            if data:
-                interactions.append({
-                    'timestamp': data[2],
-                    'relevance': data[3],
-                    'user_message': data[4],
-                    'assistant_response': data[5],
-                    'metadata': json.loads(data[6])
-                })
+        interactions = [
+            {
+                'relevance': relevance,
+                'user_message': user_message,
+                'assistant_response': assistant_response
+            }
+            for relevance, user_message, assistant_response in rows
+        ]
         
         # Process interactions for semantic memories
         self._process_session_context(user_id, interactions)
         
-        # Clean up SQLite
+        # Clean up SQLite, in one transaction - no per-id placeholder list, so no bound-parameter limit
         with self.conn:
+            self.conn.execute('''
+                DELETE FROM interactions
+                WHERE id IN (SELECT interaction_id FROM recent_contexts WHERE user_id = ?)
+            ''', (user_id,))
             self.conn.execute('DELETE FROM recent_contexts WHERE user_id = ?', (user_id,))
-            self.conn.execute('DELETE FROM interactions WHERE id IN ({})'.format(
-                ','.join('?' for _ in interaction_ids)
-            ), [interaction_id for (interaction_id,) in interaction_ids])
 
     def _process_session_context(self, user_id: str, interactions: List[Dict]) -> None:
         """
         Process entire session context to extract important information.
+        `interactions` come most relevant first.
         """
-        # Sort by relevance
-        interactions.sort(key=lambda x: x['relevance'], reverse=True)
-        
         # Combine related interactions
         processed_memories = self._combine_related_interactions(interactions)
         
-        # Store each processed memory
-        for memory in processed_memories:
-            confidence = min(1.0, memory['relevance'] + 0.2)  # Boost confidence a bit
-            self.semantic_store.store_memory(
-                content=memory['content'],
-                category=memory['category'],
-                metadata={
+        # Store all processed memories together
+        self.semantic_memory_store.batch_store_memories([
+            {
+                'content': memory['content'],
+                'category': memory['category'],
+                'metadata': {
                     'source': 'session_context',
                     'timestamp': datetime.now().isoformat(),
                     'user_id': user_id,
                     'original_interactions': memory['source_indices']
                 },
-                confidence=confidence
-            )
+                'confidence': min(1.0, memory['relevance'] + 0.2),  # Boost confidence a bit
+                'embedding': memory['embedding']
+            }
+            for memory in processed_memories
+        ])
 
     def _combine_related_interactions(self, interactions: List[Dict]) -> List[Dict]:
         """
         Combine related interactions into coherent memories.
         """
         memories = []
-        processed_indices = set()
+        if not interactions:
+            return memories
         
-        for i, interaction in enumerate(interactions):
-            if i in processed_indices:
-                continue
-                
-            # Skip low relevance interactions
-            if interaction['relevance'] <= Relevance.LOW:
+        # Encode every interaction in one batch, then compare them all pairwise at once.
+        # Encoded in memory content form, so a single-interaction memory can reuse its embedding.
+        embeddings = self._encode([
+            f"User: {interaction['user_message']}\n"
+            f"Assistant: {interaction['assistant_response']}"
+            for interaction in interactions
+        ])
+        related = embeddings @ embeddings.T > 0.8  # High similarity threshold
+        processed = np.zeros(len(interactions), dtype=bool)
+        relevances = np.fromiter((interaction['relevance'] for interaction in interactions),
+                                 dtype=np.float64, count=len(interactions))
+        
+        # Low relevance interactions never start a memory (they can still join one)
+        for i in np.flatnonzero(relevances > Relevance.LOW).tolist():
+            if processed[i]:
                 continue
             
-            related_indices = {i}
-            combined_content = []
-            
-            # Find related interactions
-            base_embedding = self.model.encode(
-                f"{interaction['user_message']} {interaction['assistant_response']}"
-            )
-            
-            for j, other in enumerate(interactions):
-                if j != i and j not in processed_indices:
-                    other_embedding = self.model.encode(
-                        f"{other['user_message']} {other['assistant_response']}"
-                    )
-                    
-                    similarity = np.dot(base_embedding, other_embedding) / (
-                        np.linalg.norm(base_embedding) * np.linalg.norm(other_embedding)
-                    )
-                    
-                    if similarity > 0.8:  # High similarity threshold
-                        related_indices.add(j)
+            # This interaction and every unprocessed one related to it
+            cluster_mask = related[i] & ~processed
+            cluster_mask[i] = True
+            processed |= cluster_mask
+            cluster = np.flatnonzero(cluster_mask).tolist()
             
             # Combine related interactions
-            for idx in related_indices:
-                curr_interaction = interactions[idx]
-                combined_content.append(
-                    f"User: {curr_interaction['user_message']}\n"
-                    f"Assistant: {curr_interaction['assistant_response']}"
-                )
-            
-            # Create combined memory
-            category = self._detect_category(combined_content)
-            processed_indices.update(related_indices)
+            combined_content = [
+                f"User: {interactions[idx]['user_message']}\n"
+                f"Assistant: {interactions[idx]['assistant_response']}"
+                for idx in cluster
+            ]
             
             memories.append({
                 'content': "\n".join(combined_content),
-                'category': category,
-                'relevance': max(interactions[i]['relevance'] for i in related_indices),
-                'source_indices': list(related_indices)
+                'category': self._detect_category(combined_content),
+                'relevance': float(relevances[cluster].max()),
+                'source_indices': cluster,
+                # Combined memories need encoding, a single interaction's content is already encoded
+                'embedding': embeddings[i] if len(cluster) == 1 else None
             })
         
         return memories
@@ -218,31 +343,20 @@ class IntegratedMemorySystem:
         """
         Detect the appropriate category for a memory based on content.
         """
-        combined_text = " ".join(content_list).lower()
+        combined_text = " ".join(content_list)
         
-        category_patterns = {
-            'preferences': [r'prefer', r'like', r'enjoy', r'rather', r'instead'],
-            'personal': [r'name', r'age', r'live', r'family', r'job', r'work'],
-            'health': [r'allerg', r'health', r'medical', r'condition', r'medication'],
-            'skills': [r'can', r'know how', r'able to', r'experience', r'skilled'],
-            'facts': [r'fact', r'true', r'always', r'never', r'must']
-        }
-        
-        category_counts = Counter()
-        
-        for category, patterns in category_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, combined_text):
-                    category_counts[category] += 1
+        # Each category scores one point per keyword occurrence, ties go to the earlier category
+        category_counts = Counter(CATEGORY_GROUPS[match.lastgroup] for match in CATEGORY_PATTERN.finditer(combined_text))
         
         if category_counts:
-            return category_counts.most_common(1)[0][0]
+            return max(CATEGORY_PATTERNS, key=category_counts.__getitem__)
         return 'general'
 
-    def _extract_and_store_semantic_memory(self, user_id: str, interaction: Dict) -> None:
+    def _extract_and_store_semantic_memory(self, user_id: str, interaction: Dict,
+                                           embedding: Optional[np.ndarray] = None) -> None:
         """
         Extract and store important information from a single interaction.
-        TODO: Run on separate thread
+        Storing (and encoding, unless `embedding` of the content is given) happens on the background writer thread.
         """
         combined_content = (
             f"User: {interaction['user_message']}\n"
@@ -251,17 +365,43 @@ class IntegratedMemorySystem:
         
         category = self._detect_category([combined_content])
         
-        self.semantic_store.store_memory(
-            content=combined_content,
-            category=category,
-            metadata={
+        self._pending_memories.put({
+            'content': combined_content,
+            'category': category,
+            'metadata': {
                 'source': 'direct_interaction',
                 'timestamp': datetime.fromtimestamp(interaction['timestamp']).isoformat(),
                 'user_id': user_id,
                 'original_metadata': interaction['metadata']
             },
-            confidence=interaction['relevance']
-        )
+            'confidence': interaction['relevance'],
+            'embedding': embedding
+        })
+    
+    def _store_pending_memories(self) -> None:
+        """
+        Background writer: store queued memories in batches.
+        Memories queued close together share one batched encode.
+        """
+        while True:
+            batch = [self._pending_memories.get()]
+            deadline = time.monotonic() + MEMORY_BATCH_WAIT
+            while len(batch) < MEMORY_BATCH_SIZE:
+                try:
+                    batch.append(self._pending_memories.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self.semantic_memory_store.batch_store_memories(batch)
+            except Exception as e:
+                logging.error(f"Error storing memories: {e}")
+            finally:
+                for _ in batch:
+                    self._pending_memories.task_done()
+
+    def flush(self) -> None:
+        """Block until every queued memory has been stored."""
+        self._pending_memories.join()
         
 # Example usage
 # if __name__ == "__main__":
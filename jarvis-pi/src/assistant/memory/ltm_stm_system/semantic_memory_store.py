@@ -1,21 +1,71 @@
 from typing import List, Dict, Any, Optional
 import sqlite3
 import json
+try:
+    # C-accelerated JSON for the metadata column, when available
+    import orjson
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
+import threading
 from datetime import datetime
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from assistant.embedding_model import get_embedding_model
 from contextlib import contextmanager
+try:
+    # Approximate nearest neighbor index for very large memory stores, when available
+    import faiss
+except ImportError:
+    faiss = None
+
+# Above this many memories, searches first shortlist by Hamming distance of sign bits
+BINARY_SEARCH_MIN_ROWS = 20000
+# Schema version, kept in PRAGMA user_version
+# 1: embeddings stored L2-normalized, 2: embeddings stored as float16
+SCHEMA_VERSION = 2
+# Embeddings are stored at half precision (half the bytes), searched at float32
+STORED_EMBEDDING_DTYPE = np.float16
+# Shortlist size (as a multiple of the result limit) rescored with full embeddings
+RESCORE_MULTIPLIER = 10
+# Above this many memories (and with faiss installed), searches without a category
+# shortlist through an inverted-file index instead, probing ANN_NPROBE clusters
+ANN_SEARCH_MIN_ROWS = 50000
+ANN_NPROBE = 8
 
 class SemanticMemoryStore:
     def __init__(self, db_path: str = "semantic_memory.db"):
         self.db_path = db_path
         # Load the sentence transformer model
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.model = get_embedding_model()
+        # Search arrays, loaded on first search and only ever replaced whole (under _arrays_lock),
+        # so a search can snapshot them while the memory writer thread appends:
+        # (matrix, bits, ids, categories) - all stored embeddings as one (N, D) L2-normalized
+        # matrix, the sign bits of each row packed into uint64 lanes, and for row i its
+        # memory id ids[i] and category categories[i]
+        self._arrays = None
+        # faiss IVF index over the rows of the matrix (ids are row numbers), built once there are enough
+        self._index = None
+        # Guards publishing _arrays and every use of _index
+        self._arrays_lock = threading.Lock()
+        # One connection per thread, kept open for the life of the thread
+        self._local = threading.local()
         self._initialize_db()
 
     def _initialize_db(self):
         """Initialize the database with tables for semantic search."""
         with self._get_connection() as conn:
+            # Write-ahead log: readers don't block on writes, and a commit is a single append
+            conn.execute("PRAGMA journal_mode=WAL")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                # Schema and stored embeddings are current - no DDL (and no schema lock) on every start
+                return
+            
             # Main memories table with embeddings
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS memories (
@@ -34,25 +84,130 @@ class SemanticMemoryStore:
                 CREATE INDEX IF NOT EXISTS idx_category 
                 ON memories(category)
             """)
+            
+            if version < 1:
+                self._normalize_stored_embeddings(conn)
+            if version < 2:
+                self._halve_stored_embeddings(conn)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    
+    def _normalize_stored_embeddings(self, conn):
+        """One-time migration: L2-normalize embeddings stored before they were normalized at write time"""
+        updates = []
+        for row in conn.execute("SELECT id, embedding FROM memories"):
+            embedding = np.frombuffer(row['embedding'], dtype=np.float32)
+            norm = np.linalg.norm(embedding)
+            if norm > 0:
+                updates.append(((embedding / norm).tobytes(), row['id']))
+        conn.executemany("UPDATE memories SET embedding = ? WHERE id = ?", updates)
+    
+    def _halve_stored_embeddings(self, conn):
+        """One-time migration: convert float32 embeddings to STORED_EMBEDDING_DTYPE"""
+        updates = [
+            (np.frombuffer(row['embedding'], dtype=np.float32).astype(STORED_EMBEDDING_DTYPE).tobytes(), row['id'])
+            for row in conn.execute("SELECT id, embedding FROM memories")
+        ]
+        conn.executemany("UPDATE memories SET embedding = ? WHERE id = ?", updates)
     
     @contextmanager
     def _get_connection(self):
-        """Database connection context manager."""
-        conn = sqlite3.connect(self.db_path)
+        """Database connection context manager, committing (or rolling back) on exit."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            # Safe with WAL - only the last commits can be lost on power failure, never corrupted
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
         try:
             yield conn
             conn.commit()
-        finally:
-            conn.close()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def _encode(self, content: str) -> np.ndarray:
+        """L2-normalized float32 embedding, so cosine similarity is a plain dot product"""
+        return self.model.encode(content, normalize_embeddings=True).astype(np.float32)
+
+    def _load_matrix(self):
+        """Load every stored embedding into the in-memory search arrays (call with _arrays_lock held)"""
+        with self._get_connection() as conn:
+            rows = conn.execute("SELECT id, category, embedding FROM memories ORDER BY id").fetchall()
+        
+        ids = np.array([row['id'] for row in rows], dtype=np.int64)
+        categories = np.array([row['category'] for row in rows], dtype=object)
+        if rows:
+            # Stored embeddings are already normalized, upcast once so searches run on BLAS
+            matrix = np.frombuffer(
+                b"".join(row['embedding'] for row in rows), dtype=STORED_EMBEDDING_DTYPE
+            ).reshape(len(rows), -1).astype(np.float32)
+        else:
+            matrix = np.empty((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        self._arrays = (matrix, self._pack_bits(matrix), ids, categories)
+
+    def _pack_bits(self, embeddings: np.ndarray) -> np.ndarray:
+        """Binary-quantize embeddings: one sign bit per dimension, packed into uint64 lanes"""
+        bits = np.packbits(embeddings > 0, axis=1)
+        padding = -bits.shape[1] % 8
+        if padding:
+            bits = np.pad(bits, ((0, 0), (0, padding)))
+        return bits.view(np.uint64)
+
+    def _build_index(self, matrix: np.ndarray):
+        """Cluster the search matrix into an inverted-file index for approximate search (call with _arrays_lock held)"""
+        dimension = matrix.shape[1]
+        clusters = int(np.sqrt(len(matrix)))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dimension), dimension, clusters, faiss.METRIC_INNER_PRODUCT)
+        index.train(matrix)
+        index.add(matrix)
+        index.nprobe = ANN_NPROBE
+        self._index = index
+
+    def _shortlist(self, bits: np.ndarray, query_embedding: np.ndarray, count: int,
+                   rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Rows of the `count` memories (out of `rows`, or all) whose sign `bits` differ
+        least from the query's
+        """
+        bits = bits if rows is None else bits[rows]
+        distances = np.bitwise_count(bits ^ self._pack_bits(query_embedding[np.newaxis, :])).sum(axis=1, dtype=np.uint16)
+        shortlist = np.arange(len(distances))
+        if len(distances) > count:
+            shortlist = np.argpartition(distances, count)[:count]
+        return shortlist if rows is None else rows[shortlist]
+
+    def _add_to_matrix(self, ids: List[int], categories: List[str], embeddings: np.ndarray):
+        """Append newly stored memories to the search arrays, if they're loaded"""
+        with self._arrays_lock:
+            if self._arrays is None:
+                return
+            matrix, bits, all_ids, all_categories = self._arrays
+            # Rows committed before the arrays were loaded are already in them
+            new = np.asarray(ids, dtype=np.int64) > (all_ids[-1] if len(all_ids) else 0)
+            if not new.any():
+                return
+            embeddings = embeddings[new]
+            if self._index is not None:
+                self._index.add(embeddings)
+            self._arrays = (
+                np.vstack([matrix, embeddings]),
+                np.vstack([bits, self._pack_bits(embeddings)]),
+                np.append(all_ids, np.asarray(ids, dtype=np.int64)[new]),
+                np.append(all_categories, np.array(categories, dtype=object)[new])
+            )
 
     def store_memory(self, content: str, category: str = "general", 
-                    metadata: Dict = None, confidence: float = 1.0) -> int:
+                    metadata: Dict = None, confidence: float = 1.0,
+                    embedding: Optional[np.ndarray] = None) -> int:
         """
         Store a new memory with its semantic embedding.
+        Pass `embedding` (L2-normalized) if the content was already encoded, to skip encoding it again.
         Returns the ID of the stored memory.
         """
         # Generate embedding for the content
-        embedding = self.model.encode(content)
+        if embedding is None:
+            embedding = self._encode(content)
         
         with self._get_connection() as conn:
             cursor = conn.execute("""
@@ -61,12 +216,15 @@ class SemanticMemoryStore:
                 VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?, ?)
             """, (
                 content,
-                embedding.tobytes(),
+                embedding.astype(STORED_EMBEDDING_DTYPE).tobytes(),
                 category,
-                json.dumps(metadata or {}),
+                _dumps(metadata or {}),
                 confidence
             ))
-            return cursor.lastrowid
+            memory_id = cursor.lastrowid
+        
+        self._add_to_matrix([memory_id], [category], embedding[np.newaxis, :])
+        return memory_id
 
     def search_memories(self, query: str, limit: int = 5, 
                        min_similarity: float = 0.5, 
@@ -76,46 +234,74 @@ class SemanticMemoryStore:
         Returns memories ordered by relevance.
         """
         # Generate embedding for the query
-        query_embedding = self.model.encode(query)
+        query_embedding = self._encode(query)
+        
+        # Cosine similarity against every memory at once (all rows are normalized),
+        # or against an ANN / Hamming-distance shortlist when there are many
+        rows = slice(None)
+        with self._arrays_lock:
+            if self._arrays is None:
+                self._load_matrix()
+            # One consistent snapshot - appends publish new arrays rather than changing these
+            matrix, bits, ids, categories = self._arrays
+            use_index = faiss is not None and not category and len(ids) >= ANN_SEARCH_MIN_ROWS
+            if use_index:
+                if self._index is None:
+                    self._build_index(matrix)
+                _, found = self._index.search(query_embedding[np.newaxis, :], RESCORE_MULTIPLIER * limit)
+        if use_index:
+            rows = found[0][(found[0] >= 0) & (found[0] < len(ids))]
+        elif len(ids) >= BINARY_SEARCH_MIN_ROWS:
+            in_category = np.flatnonzero(categories == category) if category else None
+            rows = self._shortlist(bits, query_embedding, RESCORE_MULTIPLIER * limit, in_category)
+        similarities = matrix[rows] @ query_embedding
+        if category:
+            similarities = np.where(categories[rows] == category, similarities, -np.inf)
+        
+        # Only include results above similarity threshold, best `limit` of them
+        candidates = np.flatnonzero(similarities >= min_similarity)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-similarities[candidates], limit)[:limit]]
+        candidates = candidates[np.argsort(-similarities[candidates])]
+        if not len(candidates):
+            return []
         
+        # Fetch only the matching rows
+        candidate_ids = [int(memory_id) for memory_id in ids[rows][candidates]]
         with self._get_connection() as conn:
-            # Get all relevant memories
-            if category:
-                cursor = conn.execute("SELECT * FROM memories WHERE category = ?", (category,))
-            else:
-                cursor = conn.execute("SELECT * FROM memories")
-            
-            results = []
-            for row in cursor:
-                # Convert stored embedding back to numpy array
-                stored_embedding = np.frombuffer(row['embedding'])
-                
-                # Calculate cosine similarity
-                similarity = np.dot(query_embedding, stored_embedding) / (
-                    np.linalg.norm(query_embedding) * np.linalg.norm(stored_embedding)
+            rows = {
+                row['id']: row
+                for row in conn.execute(
+                    "SELECT id, content, category, timestamp, metadata, confidence FROM memories WHERE id IN ({})".format(
+                        ','.join('?' for _ in candidate_ids)
+                    ),
+                    candidate_ids
                 )
-                
-                # Only include results above similarity threshold
-                if similarity >= min_similarity:
-                    results.append({
-                        'id': row['id'],
-                        'content': row['content'],
-                        'category': row['category'],
-                        'timestamp': row['timestamp'],
-                        'metadata': json.loads(row['metadata']),
-                        'confidence': row['confidence'],
-                        'relevance': float(similarity)
-                    })
-            
-            # Sort by relevance and return top results
-            results.sort(key=lambda x: x['relevance'], reverse=True)
-            return results[:limit]
+            }
+        
+        # Sorted by relevance
+        results = []
+        for memory_id, similarity in zip(candidate_ids, similarities[candidates]):
+            row = rows.get(memory_id)
+            if row is None:
+                continue
+            results.append({
+                'id': row['id'],
+                'content': row['content'],
+                'category': row['category'],
+                'timestamp': row['timestamp'],
+                'metadata': _loads(row['metadata']),
+                'confidence': row['confidence'],
+                'relevance': float(similarity)
+            })
+        return results
 
     def get_memory_by_id(self, memory_id: int) -> Optional[Dict[str, Any]]:
         """Retrieve a specific memory by ID."""
         with self._get_connection() as conn:
+            # Everything but the embedding BLOB, which callers never see
             row = conn.execute(
-                "SELECT * FROM memories WHERE id = ?", 
+                "SELECT id, content, category, timestamp, metadata, confidence FROM memories WHERE id = ?", 
                 (memory_id,)
             ).fetchone()
             
@@ -125,29 +311,55 @@ class SemanticMemoryStore:
                     'content': row['content'],
                     'category': row['category'],
                     'timestamp': row['timestamp'],
-                    'metadata': json.loads(row['metadata']),
+                    'metadata': _loads(row['metadata']),
                     'confidence': row['confidence']
                 }
             return None
 
     def batch_store_memories(self, memories: List[Dict[str, Any]]) -> List[int]:
-        """Store multiple memories efficiently."""
-        ids = []
+        """
+        Store multiple memories efficiently.
+        Memories may carry a precomputed (L2-normalized) 'embedding', the rest are encoded here.
+        """
+        if not memories:
+            return []
+        
+        embeddings = np.empty((len(memories), self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        to_encode = []
+        for i, memory in enumerate(memories):
+            if memory.get('embedding') is not None:
+                embeddings[i] = memory['embedding']
+            else:
+                to_encode.append(i)
+        if to_encode:
+            # One batched encode - sentence-transformers groups inputs by length to minimize padding
+            embeddings[to_encode] = self.model.encode(
+                [memories[i]['content'] for i in to_encode],
+                batch_size=32,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+        
         with self._get_connection() as conn:
-            for memory in memories:
-                embedding = self.model.encode(memory['content'])
-                cursor = conn.execute("""
-                    INSERT INTO memories 
-                    (content, embedding, category, timestamp, metadata, confidence)
-                    VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?, ?)
-                """, (
+            conn.executemany("""
+                INSERT INTO memories 
+                (content, embedding, category, timestamp, metadata, confidence)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?, ?)
+            """, [
+                (
                     memory['content'],
-                    embedding.tobytes(),
+                    embedding.astype(STORED_EMBEDDING_DTYPE).tobytes(),
                     memory.get('category', 'general'),
-                    json.dumps(memory.get('metadata', {})),
+                    _dumps(memory.get('metadata', {})),
                     memory.get('confidence', 1.0)
-                ))
-                ids.append(cursor.lastrowid)
+                )
+                for memory, embedding in zip(memories, embeddings)
+            ])
+            # Rows inserted in one transaction get consecutive AUTOINCREMENT ids
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        ids = list(range(last_id - len(memories) + 1, last_id + 1))
+        
+        self._add_to_matrix(ids, [memory.get('category', 'general') for memory in memories], embeddings)
         return ids
 
 # Example usage
@@ -1,13 +1,58 @@
 import os
-import json
+try:
+    # C-accelerated serializer for cached video lists, when available
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    import json
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+    _loads = json.loads
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import List, Dict, Optional
-from datetime import datetime, timedelta
-from openai import OpenAI
+from datetime import timedelta
+import httplib2
 from dotenv import load_dotenv
 from googleapiclient.discovery import build
 from youtube_transcript_api import YouTubeTranscriptApi
 
+SUMMARY_MODEL = "gpt-4o-mini"
+# Transcript sent for summarizing, in tokens - characters (MAX_TRANSCRIPT_LENGTH) if tiktoken is unavailable
+MAX_TRANSCRIPT_TOKENS = 25000
 MAX_TRANSCRIPT_LENGTH = 100000
+# How long a fetched latest-video transcript is reused (seconds)
+TRANSCRIPT_CACHE_TTL = 600
+# Max channels fetched and summarized concurrently
+MAX_CHANNEL_WORKERS = 5
+
+@lru_cache(maxsize=1)
+def _summary_encoding():
+    """Tokenizer of SUMMARY_MODEL, loaded on first use (None if tiktoken is unavailable)"""
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(SUMMARY_MODEL)
+    except Exception as e:
+        logging.error(f"Error loading tokenizer, truncating transcripts by characters: {e}")
+        return None
+
+def _truncate_transcript(transcript: str) -> str:
+    """The start of `transcript`, up to MAX_TRANSCRIPT_TOKENS tokens"""
+    encoding = _summary_encoding()
+    if encoding is None:
+        return transcript[:MAX_TRANSCRIPT_LENGTH]
+    tokens = encoding.encode(transcript)
+    if len(tokens) <= MAX_TRANSCRIPT_TOKENS:
+        return transcript
+    return encoding.decode(tokens[:MAX_TRANSCRIPT_TOKENS])
 
 class YouTubeChannelMonitor:
     def __init__(self):
@@ -17,9 +62,17 @@ class YouTubeChannelMonitor:
         
         self.shapiro_channel_id = 'UCnQC_G5Xsjhp9fEJKuIcrSw'  # Ben Shapiro's channel: The Daily Wire
         
-        # Cache file for storing video information
-        self.cache_file = 'youtube_cache.json'
+        # Cache database for storing video information, one row per channel
+        self.cache_file = 'youtube_cache.db'
         self.cache_duration = timedelta(hours=1)  # How long to keep cache
+        self._cache_conn = None
+        self._cache_lock = threading.Lock()
+        
+        # One HTTP connection per thread - the API client's default one is not thread-safe
+        self._http = threading.local()
+        
+        # In-memory latest-video transcripts: channel_id -> (fetched at, monotonic seconds; transcript data)
+        self._transcript_cache = {}
         
     def get_channel_latest_videos(self, channel_id: str, max_results: int = 5) -> List[Dict]:
         """
@@ -42,7 +95,7 @@ class YouTubeChannelMonitor:
             channels_response = self.youtube.channels().list(
                 id=channel_id,
                 part='contentDetails'
-            ).execute()
+            ).execute(http=self._thread_http())
             
             print(f"Channels response: {channels_response}")
             
@@ -53,7 +106,7 @@ class YouTubeChannelMonitor:
                 playlistId=playlist_id,
                 part='snippet',
                 maxResults=max_results
-            ).execute()
+            ).execute(http=self._thread_http())
             
             videos = []
             for item in videos_response['items']:
@@ -81,6 +134,13 @@ class YouTubeChannelMonitor:
             print(f"Error fetching videos: {e}")
             return []
 
+    def _thread_http(self) -> httplib2.Http:
+        """This thread's HTTP connection for API requests, opened on first use"""
+        http = getattr(self._http, 'http', None)
+        if http is None:
+            http = self._http.http = httplib2.Http()
+        return http
+
     def get_latest_video_transcript(self, channel_id: str = None) -> Optional[Dict]:
         """
         Get transcript of the latest video from a channel.
@@ -88,6 +148,12 @@ class YouTubeChannelMonitor:
         """
         try:
             channel_id = channel_id or self.shapiro_channel_id
+            
+            # Reuse a recent fetch (e.g. the get_news action reads the transcript, then summarizes it)
+            cached = self._transcript_cache.get(channel_id)
+            if cached and time.monotonic() - cached[0] < TRANSCRIPT_CACHE_TTL:
+                return cached[1]
+            
             latest_videos = self.get_channel_latest_videos(channel_id, max_results=1)
             
             if not latest_videos:
@@ -97,13 +163,15 @@ class YouTubeChannelMonitor:
             transcript_text = self._get_transcript(video['video_id'])
             
             if transcript_text:
-                return {
+                video_data = {
                     'video_id': video['video_id'],
                     'title': video['title'],
                     'published_at': video['published_at'],
                     'transcript': transcript_text,
                     'url': f"https://www.youtube.com/watch?v={video['video_id']}"
                 }
+                self._transcript_cache[channel_id] = (time.monotonic(), video_data)
+                return video_data
                 
             return None
             
@@ -117,76 +185,79 @@ class YouTubeChannelMonitor:
             transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
             
             # Combine transcript pieces with timestamps
-            formatted_transcript = []
-            for entry in transcript_list:
-                time_in_mins = int(entry['start']) // 60
-                time_in_secs = int(entry['start']) % 60
-                formatted_transcript.append(
-                    f"[{time_in_mins}:{time_in_secs:02d}] {entry['text']}"
-                )
-            
-            return '\n'.join(formatted_transcript)
+            return '\n'.join(
+                f"[{time_in_mins}:{time_in_secs:02d}] {entry['text']}"
+                for entry in transcript_list
+                for time_in_mins, time_in_secs in (divmod(int(entry['start']), 60),)
+            )
             
         except Exception as e:
             print(f"Error getting transcript: {e}")
             return None
 
+    def _cache_connection(self) -> sqlite3.Connection:
+        """The cache database connection, opened (and the table created) on first use"""
+        if self._cache_conn is None:
+            conn = sqlite3.connect(self.cache_file, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS channel_videos (
+                    channel_id TEXT PRIMARY KEY,
+                    timestamp REAL,
+                    videos BLOB
+                )
+            ''')
+            self._cache_conn = conn
+        return self._cache_conn
+
     def _get_from_cache(self, channel_id: str) -> Optional[List[Dict]]:
         """Get data from cache if it exists and is fresh."""
         try:
-            if not os.path.exists(self.cache_file):
-                return None
-                
-            with open(self.cache_file, 'r') as f:
-                cache = json.load(f)
-                
-            channel_cache = cache.get(channel_id)
-            if not channel_cache:
+            with self._cache_lock:
+                row = self._cache_connection().execute(
+                    'SELECT timestamp, videos FROM channel_videos WHERE channel_id = ?',
+                    (channel_id,)
+                ).fetchone()
+            if not row:
                 return None
                 
             # Check if cache is fresh
-            cache_time = datetime.fromisoformat(channel_cache['timestamp'])
-            if datetime.now() - cache_time > self.cache_duration:
+            if time.time() - row[0] > self.cache_duration.total_seconds():
                 return None
                 
-            return channel_cache['videos']
+            return _loads(row[1])
             
         except Exception:
             return None
 
     def _cache_results(self, channel_id: str, videos: List[Dict]):
-        """Cache results for a channel."""
+        """Cache results for a channel - a single row upsert, the other channels are untouched."""
         try:
-            # Load existing cache
-            cache = {}
-            if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'r') as f:
-                    cache = json.load(f)
-            
-            # Update cache
-            cache[channel_id] = {
-                'timestamp': datetime.now().isoformat(),
-                'videos': videos
-            }
-            
-            # Save cache
-            with open(self.cache_file, 'w') as f:
-                json.dump(cache, f)
+            videos_data = _dumps(videos)
+            with self._cache_lock:
+                conn = self._cache_connection()
+                with conn:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO channel_videos (channel_id, timestamp, videos) VALUES (?, ?, ?)',
+                        (channel_id, time.time(), videos_data)
+                    )
                 
         except Exception as e:
             print(f"Error caching results: {e}")
 
-    def summarize_latest_video(self, openai_client) -> Optional[Dict]:
+    def summarize_latest_video(self, openai_client, channel_id: str = None) -> Optional[Dict]:
         """
         Get and summarize the latest video using OpenAI.
         
         Args:
             openai_client: Initialized OpenAI client
+            channel_id: The YouTube channel ID, Ben Shapiro's channel if not given
             
         Returns:
             Dictionary containing video info and summary
         """
-        video_data = self.get_latest_video_transcript()
+        video_data = self.get_latest_video_transcript(channel_id)
         if not video_data:
             return None
             
@@ -203,12 +274,12 @@ class YouTubeChannelMonitor:
             3. Any significant conclusions
             
             Transcript:
-            {video_data['transcript'][:MAX_TRANSCRIPT_LENGTH]}  # Limit transcript length for API
+            {_truncate_transcript(video_data['transcript'])}  # Limit transcript length for API
             """
             
             # Get summary from ChatGPT
             response = openai_client.chat.completions.create(
-                model="gpt-4o-mini",
+                model=SUMMARY_MODEL,
                 messages=[
                     {"role": "system", "content": "You are a helpful assistant that summarizes video transcripts accurately and objectively."},
                     {"role": "user", "content": prompt}
@@ -232,6 +303,27 @@ class YouTubeChannelMonitor:
             print(f"Error summarizing video: {e}")
             return None
 
+    def summarize_latest_videos(self, openai_client, channel_ids: List[str]) -> List[Optional[Dict]]:
+        """
+        Get and summarize the latest video of several channels at once.
+        Each channel's API requests, transcript fetch and summary run concurrently with the others'.
+        
+        Args:
+            openai_client: Initialized OpenAI client
+            channel_ids: The YouTube channel IDs
+            
+        Returns:
+            One summary dictionary (or None) per channel, in the order given
+        """
+        if not channel_ids:
+            return []
+        with ThreadPoolExecutor(max_workers=min(MAX_CHANNEL_WORKERS, len(channel_ids)),
+                                thread_name_prefix="youtube") as executor:
+            return list(executor.map(
+                lambda channel_id: self.summarize_latest_video(openai_client, channel_id),
+                channel_ids
+            ))
+
 """ potential enhancements:
 
 Channel Features:
@@ -0,0 +1,29 @@
+# src/assistant/openai_client.py
+
+import atexit
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# Shared client instance, created on first use
+_client = None
+
+def get_openai_client() -> "OpenAI":
+    """
+    Get the process-wide OpenAI client.
+    Every caller shares one keep-alive connection pool, so back-to-back requests
+    (e.g. action request -> final response -> TTS) reuse the same TCP+TLS connection.
+    """
+    global _client
+
+    if _client is None:
+        # Imported on first use - the SDK (and pydantic) is slow to load on the Pi
+        import httpx
+        from openai import OpenAI
+        _client = OpenAI(http_client=httpx.Client(
+            limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=300)
+        ))
+        # Close pooled connections cleanly on shutdown
+        atexit.register(_client.close)
+    return _client
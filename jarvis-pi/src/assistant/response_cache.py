@@ -0,0 +1,159 @@
+# src/assistant/response_cache.py
+
+import hashlib
+try:
+    # C-accelerated serializer for cache keys, when available
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_SORT_KEYS)
+except ImportError:
+    import json
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, sort_keys=True, default=str).encode()
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import numpy as np
+from assistant.embedding_model import DEFAULT_EMBEDDING_MODEL, get_embedding_model
+from assistant.prompts import SYSTEM_PROMPT
+
+# Minimum cosine similarity for a cached reply to be reused
+SIMILARITY_THRESHOLD = 0.92
+# How long a cached reply stays valid (seconds)
+CACHE_TTL = 3600
+# Max number of cached replies
+MAX_CACHED_RESPONSES = 256
+# Max number of exact-match cached replies
+MAX_EXACT_RESPONSES = 512
+# Shorter requests ("yes", "tell me more") depend on the conversation, never cache them
+MIN_CACHEABLE_WORDS = 4
+
+def _context_key(context: List[Tuple[str, str, str]]) -> str:
+    """Digest of the conversation context a reply was given in"""
+    return hashlib.sha256(_dumps(context)).hexdigest()
+
+class ExactResponseCache:
+    """
+    Reuses AI replies for requests identical to an earlier one, with identical context.
+    Keyed on a hash of (model, system prompt, context, request text), evicting least recently used.
+    """
+    def __init__(self, model: str):
+        self.model = model
+        self.system_prompt_hash = hashlib.sha256(SYSTEM_PROMPT.encode()).hexdigest()
+        self.responses = OrderedDict()
+        # Requests may be processed concurrently (process_commands_bulk)
+        self._lock = threading.Lock()
+
+    def _key(self, text: str, context: List[Tuple[str, str, str]]) -> str:
+        payload = _dumps({"m": self.model, "s": self.system_prompt_hash, "c": context, "t": text})
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, text: str, context: List[Tuple[str, str, str]]) -> Optional[str]:
+        """Get the cached reply for this exact request and context, if any"""
+        key = self._key(text, context)
+        with self._lock:
+            response = self.responses.get(key)
+            if response is not None:
+                self.responses.move_to_end(key)
+        return response
+
+    def put(self, text: str, context: List[Tuple[str, str, str]], response: str) -> None:
+        """Cache the reply to a request"""
+        if not response:
+            return
+        key = self._key(text, context)
+        with self._lock:
+            self.responses[key] = response
+            if len(self.responses) > MAX_EXACT_RESPONSES:
+                self.responses.popitem(last=False)
+
+class SemanticResponseCache:
+    """
+    Reuses AI replies for repeated or paraphrased requests made in the same conversation context.
+    Requests are matched by cosine similarity of their sentence embeddings. A reply is only reused with
+    identical context, so a follow-up ("tell me more about that") never gets another conversation's reply.
+    """
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL):
+        self.model_name = model_name
+        self.model = None
+        # Row i of `embeddings` (L2-normalized) belongs to responses[i] / timestamps[i] / contexts[i]
+        self.embeddings = None
+        self.responses = []
+        self.timestamps = np.empty(0)
+        # Context digest (`_context_key`) of each cached reply
+        self.contexts = np.empty(0, dtype=object)
+        # Embedding of the last looked-up request, reused when its reply is stored
+        self._last_query = (None, None)
+        # Guards the cached entries, which concurrent requests (process_commands_bulk) read and replace
+        self._lock = threading.Lock()
+
+        # Load the model off the main thread; the cache is simply bypassed until it's ready
+        self._model_ready = threading.Event()
+        threading.Thread(target=self._load_model, daemon=True).start()
+
+    def _load_model(self):
+        try:
+            self.model = get_embedding_model(self.model_name)
+            self._model_ready.set()
+        except Exception as e:
+            logging.error(f"Error loading response cache model: {e}")
+
+    def _embed(self, text: str) -> np.ndarray:
+        # One read of the pair, so a concurrent request can't mix its text with our embedding
+        last_text, last_embedding = self._last_query
+        if last_text == text:
+            return last_embedding
+        embedding = self.model.encode(text, normalize_embeddings=True).astype(np.float32)
+        self._last_query = (text, embedding)
+        return embedding
+
+    def _normalize(self, text: str) -> Optional[str]:
+        """Normalized request text, or None if the request shouldn't be cached"""
+        text = " ".join(text.lower().split())
+        if not self._model_ready.is_set() or len(text.split()) < MIN_CACHEABLE_WORDS:
+            return None
+        return text
+
+    def get(self, text: str, context: List[Tuple[str, str, str]]) -> Optional[str]:
+        """Get the cached reply for a similar enough request in the same context, if any"""
+        text = self._normalize(text)
+        if text is None or not self.responses:
+            return None
+
+        embedding = self._embed(text)
+        context_key = _context_key(context)
+        with self._lock:
+            similarities = self.embeddings @ embedding
+            similarities[time.monotonic() - self.timestamps > CACHE_TTL] = -1.0
+            similarities[self.contexts != context_key] = -1.0
+            best = int(np.argmax(similarities))
+            if similarities[best] >= SIMILARITY_THRESHOLD:
+                return self.responses[best]
+        return None
+
+    def put(self, text: str, context: List[Tuple[str, str, str]], response: str) -> None:
+        """Cache the reply to a request"""
+        text = self._normalize(text)
+        if text is None or not response:
+            return
+
+        embedding = self._embed(text)[np.newaxis, :]
+        context_key = np.array([_context_key(context)], dtype=object)
+        with self._lock:
+            now = time.monotonic()
+            if self.embeddings is None:
+                self.embeddings = embedding
+            else:
+                # Drop expired entries, and the oldest ones beyond capacity
+                keep = np.flatnonzero(now - self.timestamps <= CACHE_TTL)[-(MAX_CACHED_RESPONSES - 1):]
+                self.embeddings = np.vstack([self.embeddings[keep], embedding])
+                self.responses = [self.responses[i] for i in keep]
+                self.timestamps = self.timestamps[keep]
+                self.contexts = self.contexts[keep]
+            self.responses.append(response)
+            self.timestamps = np.append(self.timestamps, now)
+            self.contexts = np.append(self.contexts, context_key)
@@ -1,105 +1,217 @@
 # src/assistant/text_to_speech.py
 
+import hashlib
 import logging
-from openai import OpenAI
-import io
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from functools import lru_cache
+from typing import Optional
+from assistant.openai_client import get_openai_client
 import pygame
 import time
 import threading
-from queue import Queue
+
+# How often the playback thread checks whether the current clip has finished (seconds)
+PLAYBACK_POLL_INTERVAL = 0.02
+
+# OpenAI TTS "pcm" output: raw 24 kHz, 16-bit signed little-endian, mono - no decoding needed
+TTS_SAMPLE_RATE = 24000
+TTS_SAMPLE_BYTES = 2
+# Streamed audio is handed to the mixer in pieces of this many bytes (0.25 s), as soon as each arrives
+PCM_CHUNK_BYTES = TTS_SAMPLE_RATE * TTS_SAMPLE_BYTES // 4
+# Max clips waiting or playing - each holds an open response stream; speak() blocks while this many are
+MAX_QUEUED_CLIPS = 4
+# Synthesized clips kept for repeated phrases ("Okay, I'll stop"), and the longest clip kept (bytes, 5 s)
+MAX_CACHED_CLIPS = 32
+MAX_CACHED_CLIP_BYTES = TTS_SAMPLE_RATE * TTS_SAMPLE_BYTES * 5
+
+@lru_cache(maxsize=1)
+def _speech_channel() -> "pygame.mixer.Channel":
+    """
+    The mixer channel speech plays on, opening the audio device on first use
+    Opened once per process, however many TextToSpeech instances there are.
+    """
+    # Initialize pygame mixer in the TTS output format, so streamed PCM plays as is.
+    # allowedchanges=0 holds SDL to that format - it converts for the device itself rather than
+    # opening it at e.g. 48 kHz stereo, which raw 24 kHz mono Sound buffers would play back wrong.
+    pygame.mixer.init(frequency=TTS_SAMPLE_RATE, size=-16, channels=1, allowedchanges=0)
+    # Speech plays on its own channel; pieces of a clip are queued on it back to back
+    pygame.mixer.set_reserved(1)
+    return pygame.mixer.Channel(0)
 
 class TextToSpeech:
     def __init__(self):
         logging.debug("Initializing TextToSpeech class.")
-        self.client = OpenAI()
-        # Initialize pygame mixer
-        pygame.mixer.init()
-        self.audio_queue = Queue()
+        self.client = get_openai_client()
+        self.channel = _speech_channel()
         self.is_speaking = False
-        self._setup_playback_thread()
-    
-    def _setup_playback_thread(self):
-        """Initialize and start the playback thread"""
-        logging.debug("Setting up playback thread.")
-        self.playback_thread = threading.Thread(target=self._process_audio_queue, daemon=True)
-        self.playback_thread.start()
-        
+        # Plays clips one at a time, in the order they were spoken
+        self._playback_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-play")
+        self._clip_slots = threading.BoundedSemaphore(MAX_QUEUED_CLIPS)
+        # Playback of the clip spoken last - once it's done, all speech is
+        self._last_clip = None
+        # Stream of each clip not played yet, so stop() can cancel the clip and close its stream
+        self._pending_clips = {}
+        # Called (on the playback thread) whenever all speech so far has played, so nobody polls is_speaking
+        self.done_callback = None
+        # Sounds of recently spoken (voice, text) pairs by digest, least recently used first
+        self._clip_cache = OrderedDict()
+        self._clip_cache_lock = threading.Lock()
+        # Bumped by stop(); a clip spoken before the latest stop() abandons the rest of its playback
+        self._generation = 0
+
     def stop(self):
         """Stop the TTS"""
         logging.debug("Stopping text-to-speech playback.")
-        pygame.mixer.music.stop()
+        self._generation += 1
+        # Drop every clip still waiting to play, not just the one playing
+        for clip in list(self._pending_clips):
+            clip.cancel()
+        self.channel.stop()
         self.is_speaking = False
-        
-    def speak(self, text, voice="onyx"):
+
+    def speak(self, text, voice="onyx") -> Optional[Future]:
         """
         Convert text to speech using OpenAI's API and play it immediately
         voice options: alloy, echo, fable, onyx, nova, shimmer
+        The request is sent here; its audio is played by the playback thread as it streams in.
+        Returns the clip's playback, done once it has played (None if the request failed).
         """
         logging.debug(f"Received text to speak: {text} with voice: {voice}")
+        stream = ExitStack()
         try:
-            # Generate speech using OpenAI
-            response = self.client.audio.speech.create(
-                model="tts-1",
-                voice=voice,
-                input=text
-            )
-            logging.debug("Speech generated successfully.")
-            
-            # Get the audio data in memory
-            audio_data = io.BytesIO()
-            for chunk in response.iter_bytes(chunk_size=4096):
-                audio_data.write(chunk)
-            audio_data.seek(0)
-            logging.debug("Audio data written to memory.")
-            
-            # Add to playback queue
-            self.audio_queue.put(audio_data)
-            logging.debug("Audio data added to queue.")
-            
-            # Wait until speech is complete if needed
-            while self.is_speaking:
-                logging.debug("Waiting for current speech to complete.")
-                time.sleep(0.1)
-            
+            key = hashlib.blake2b(f"{voice}\0{text}".encode(), digest_size=16).digest()
+            with self._clip_cache_lock:
+                sound = self._clip_cache.get(key)
+                if sound is not None:
+                    self._clip_cache.move_to_end(key)
+
+            if sound is not None:
+                # Spoken before - no API round-trip, and played as is
+                logging.debug("Speech found in cache.")
+                key, source = None, sound
+            else:
+                # Generate speech using OpenAI - returns once the response headers arrive, the body is streamed
+                response = stream.enter_context(self.client.audio.speech.with_streaming_response.create(
+                    model="tts-1",
+                    voice=voice,
+                    input=text,
+                    response_format="pcm"
+                ))
+                logging.debug("Speech stream opened.")
+                source = response.iter_bytes(PCM_CHUNK_BYTES)
+
+            # Queue for playback - the playback thread closes the stream when done with it
+            self._clip_slots.acquire()
+            clip = self._playback_executor.submit(self._play_clip, key, stream, source, self._generation)
+            self._pending_clips[clip] = stream
+            clip.add_done_callback(self._clip_done)
+            self._last_clip = clip
+            logging.debug("Audio added to queue.")
+            return clip
+
         except Exception as e:
             logging.error(f"Error in text-to-speech: {e}")
+            stream.close()
+            return None
+
+    def _stopped(self, generation: int) -> bool:
+        """Whether stop() was called since the clip of this generation was spoken"""
+        return generation != self._generation
+
+    def _play_pcm(self, pcm: bytes, generation: int):
+        """Play a piece of PCM audio right after whatever is already playing on the speech channel"""
+        self._play_sound(pygame.mixer.Sound(buffer=pcm), generation)
+
+    def _play_sound(self, sound: "pygame.mixer.Sound", generation: int):
+        """Play a sound right after whatever is already playing on the speech channel"""
+        # The channel holds one playing and one queued sound
+        while self.channel.get_queue() is not None and not self._stopped(generation):
+            time.sleep(PLAYBACK_POLL_INTERVAL)
+        if self._stopped(generation):
+            return
+        if self.channel.get_busy():
+            self.channel.queue(sound)
+        else:
+            self.channel.play(sound)
+
+    def _cache_clip(self, key: bytes, pcm: bytes):
+        """Keep a completely received clip for the next time the same text is spoken"""
+        if not pcm or len(pcm) > MAX_CACHED_CLIP_BYTES:
+            return
+        # As played - in whole samples
+        sound = pygame.mixer.Sound(buffer=pcm[:len(pcm) - len(pcm) % TTS_SAMPLE_BYTES])
+        with self._clip_cache_lock:
+            self._clip_cache[key] = sound
+            if len(self._clip_cache) > MAX_CACHED_CLIPS:
+                self._clip_cache.popitem(last=False)
+
+    def _play_clip(self, key: Optional[bytes], stream: ExitStack, chunks, generation: int):
+        """
+        Play one clip on the playback thread
+        `key` is the clip's cache key if it isn't cached yet, `chunks` its PCM chunks or cached Sound,
+        `generation` the stop() generation it was spoken in.
+        """
+        logging.debug("Retrieved audio from queue.")
+        self.is_speaking = True
+        try:
+            # Play the audio as it arrives, in whole samples
+            received = []
+            with stream:
+                pending = b""
+                if isinstance(chunks, pygame.mixer.Sound):
+                    self._play_sound(chunks, generation)
+                    chunks = ()
+                for chunk in chunks:
+                    if self._stopped(generation):
+                        break
+                    received.append(chunk)
+                    pending += chunk
+                    if len(pending) >= PCM_CHUNK_BYTES:
+                        playable = len(pending) - len(pending) % TTS_SAMPLE_BYTES
+                        self._play_pcm(pending[:playable], generation)
+                        pending = pending[playable:]
+                playable = len(pending) - len(pending) % TTS_SAMPLE_BYTES
+                if playable and not self._stopped(generation):
+                    self._play_pcm(pending[:playable], generation)
+            logging.debug("Audio playback started.")
+            if key is not None and not self._stopped(generation):
+                self._cache_clip(key, b"".join(received))
+
+            # Wait for audio to finish
+            while self.channel.get_busy() and not self._stopped(generation):
+                time.sleep(PLAYBACK_POLL_INTERVAL)
+            logging.debug("Audio playback finished.")
+
+        finally:
             self.is_speaking = False
 
-    def _process_audio_queue(self):
-        """Process audio queue in a separate thread"""
-        logging.debug("Starting audio queue processing thread.")
-        while True:
-            try:
-                # Get audio data from queue
-                audio_data = self.audio_queue.get()
-                logging.debug("Retrieved audio data from queue.")
-                self.is_speaking = True
-                
-                # Play the audio
-                pygame.mixer.music.load(audio_data)
-                pygame.mixer.music.play()
-                logging.debug("Audio playback started.")
-                
-                # Wait for audio to finish
-                while pygame.mixer.music.get_busy():
-                    logging.debug("Audio is playing...")
-                    time.sleep(0.2)
-                
-                self.is_speaking = False
-                self.audio_queue.task_done()
-                logging.debug("Audio playback finished.")
-                
-            except Exception as e:
-                logging.error(f"Error in audio playback: {e}")
-                self.is_speaking = False
+    def _clip_done(self, clip: Future):
+        """Free the clip's queue slot, report its playback error if any, and signal when all speech is done"""
+        stream = self._pending_clips.pop(clip, None)
+        self._clip_slots.release()
+        if clip.cancelled():
+            # Never played, so its stream was never closed by the playback thread
+            if stream is not None:
+                stream.close()
+        elif clip.exception() is not None:
+            logging.error(f"Error in audio playback: {clip.exception()}")
+        if clip is self._last_clip and self.done_callback:
+            self.done_callback()
 
     def wait_until_done(self):
         """Wait until all speech is complete"""
         logging.debug("Waiting for all speech to complete.")
-        while self.is_speaking or not self.audio_queue.empty():
-            time.sleep(0.1)
-            
+        # Clips play in order, so the last one spoken finishes last
+        clip = self._last_clip
+        if clip is not None:
+            wait((clip,))
+
     def cleanup(self):
         """Cleanup pygame resources"""
         logging.debug("Cleaning up pygame resources.")
-        pygame.mixer.quit()
\ No newline at end of file
+        self.stop()
+        self._playback_executor.shutdown(wait=False, cancel_futures=True)
+        pygame.mixer.quit()
+        _speech_channel.cache_clear()
@@ -1,62 +1,155 @@
 import logging
-from typing import List, Tuple, Dict
+from functools import lru_cache
+from typing import List, Tuple, Dict, Optional
 import re
 from assistant.prompts import SYSTEM_PROMPT
+from utils.system_utils import find_timezone
+
+# Static prompt prefix - always first and byte-identical so providers can cache it. Never mutate.
+OPENAI_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+# Pass as the `system` argument of Anthropic's `messages.create`
+CLAUDE_SYSTEM = [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+
+# Most recent context turns replayed to the AI, and max characters kept per message
+MAX_CONTEXT_TURNS = 6
+MAX_CONTEXT_MESSAGE_CHARS = 2000
+# Prompt tokens (system prompt + context + request) sent per request; oldest context turns are dropped to fit
+MAX_PROMPT_TOKENS = 4096 - 150
+
+# Matches JSON content within ```json code delimiters
+JSON_BLOCK_PATTERN = re.compile(r"```json\s*({.*?})\s*```", re.DOTALL)
+
+# Requests that map straight to a system action, no AI needed to pick it
+TIME_IN_PATTERN = re.compile(r"\btime (?:is it )?in ([a-z][a-z .'-]*?)[?.!]*$", re.IGNORECASE)
+LOCAL_TIME_PATTERN = re.compile(r"\b(?:what time is it|what's the time|what is the time|(?:the )?current time)[?.!]*$", re.IGNORECASE)
+DATE_PATTERN = re.compile(r"\b(?:what(?:'s| is) (?:the|today's) date|what day is (?:it|today)|today's date)[?.!]*$", re.IGNORECASE)
+SYSTEM_INFO_PATTERN = re.compile(r"\b(?:system|cpu|memory) (?:info|usage|status)\b", re.IGNORECASE)
+    
+def _truncate_middle(text: str, limit: int = MAX_CONTEXT_MESSAGE_CHARS) -> str:
+    """Shorten long text to `limit` characters, keeping its start and end"""
+    if len(text) <= limit:
+        return text
+    half = (limit - 5) // 2
+    return f"{text[:half]} ... {text[-half:]}"
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """Tokenizer for prompt budgeting, loaded on first use (None if tiktoken is unavailable)"""
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model("gpt-4")
+    except Exception as e:
+        logging.error(f"Error loading tokenizer, prompt token budget disabled: {e}")
+        return None
+
+@lru_cache(maxsize=1)
+def _system_prompt_tokens() -> int:
+    """Token count of the static system prompt, computed once"""
+    return len(_encoding().encode(SYSTEM_PROMPT))
+
+def _bounded_context(context: List[Tuple[str, str, str]], text: str = "") -> List[Tuple[str, str]]:
+    """
+    Most recent context turns, with long messages trimmed, to cap prompt size
+    Older turns are dropped if the prompt would exceed `MAX_PROMPT_TOKENS`
+    """
+    turns = [
+        (_truncate_middle(user_message), _truncate_middle(assistant_response))
+        for user_message, assistant_response, _ in context[-MAX_CONTEXT_TURNS:]
+    ]
+    encoding = _encoding()
+    if encoding is None:
+        return turns
+    
+    budget = MAX_PROMPT_TOKENS - _system_prompt_tokens() - len(encoding.encode(text))
+    # Keep turns newest to oldest while they fit
+    kept = 0
+    for user_message, assistant_response in reversed(turns):
+        budget -= len(encoding.encode(user_message)) + len(encoding.encode(assistant_response))
+        if budget < 0:
+            break
+        kept += 1
+    return turns[len(turns) - kept:]
     
 def format_messages_for_openai(text: str, context: List[Tuple[str, str, str]]) -> List[Dict]:
     """Format messages for OpenAI API"""
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    turns = _bounded_context(context, text)
+    # Sized up front: system prompt, a user/assistant pair per turn, current message
+    messages = [None] * (2 * len(turns) + 2)
+    messages[0] = OPENAI_SYSTEM_MESSAGE
     
     # Add context from previous interactions
-    for user_message, assistant_response, _ in context:
-        messages.append({"role": "user", "content": user_message})
-        messages.append({"role": "assistant", "content": assistant_response})
+    for i, (user_message, assistant_response) in enumerate(turns):
+        messages[2 * i + 1] = {"role": "user", "content": user_message}
+        messages[2 * i + 2] = {"role": "assistant", "content": assistant_response}
     
     # Add current message
-    messages.append({"role": "user", "content": text})
-    print(f"👀 OpenAI messages:")
-    for message in messages:
-        if message['role'] != "system":
-            print(f"➡️ {message['role']}: {message['content']}")
-        else:
-            print(f"🤖 SYSTEM PROMPT LENGTH: {len(message['content'])} characters")
+    messages[-1] = {"role": "user", "content": text}
+    if logging.root.isEnabledFor(logging.DEBUG):
+        logging.debug("👀 OpenAI messages:")
+        for message in messages:
+            if message['role'] != "system":
+                logging.debug("➡️ %s: %s", message['role'], message['content'])
+            else:
+                logging.debug("🤖 SYSTEM PROMPT LENGTH: %d characters", len(message['content']))
     return messages
 
 def format_messages_for_claude(text: str, context: List[Tuple[str, str, str]]) -> List[Dict]:
-    """Format messages for Claude API"""
-    # Build conversation history
-    conversation = f"System: {SYSTEM_PROMPT}\n\n"
+    """
+    Format messages for Claude API
+    The system prompt is not included - pass `CLAUDE_SYSTEM` as the `system` argument,
+    which keeps it a separate, cacheable prefix.
+    """
+    turns = _bounded_context(context, text)
+    # Sized up front: a user/assistant pair per turn, current message
+    messages = [None] * (2 * len(turns) + 1)
     
     # Add context
-    for user_message, assistant_response, _ in context:
-        conversation += f"Human: {user_message}\n\n"
-        conversation += f"Assistant: {assistant_response}\n\n"
+    for i, (user_message, assistant_response) in enumerate(turns):
+        messages[2 * i] = {"role": "user", "content": user_message}
+        messages[2 * i + 1] = {"role": "assistant", "content": assistant_response}
     
     # Add current message
-    conversation += f"Human: {text}\n\nAssistant:"
+    messages[-1] = {"role": "user", "content": text}
     
-    return [{"role": "user", "content": conversation}]
+    return messages
 
 def extract_json_from_str(response_text: str) -> str:
     """
     Extract JSON content from a response with JSON code delimiters.
     NOTE: LLM sometimes returns a JSON object in a str w/ code delimiters, maybe we can fix in system prompt?
     """
-    if type(response_text) != str:
+    if not isinstance(response_text, str):
         return response_text
     
-    try:
-        # Regular expression to match JSON content within code delimiters
-        json_pattern = r"```json\s*({.*?})\s*```"
-        match = re.search(json_pattern, response_text, re.DOTALL)
-        
-        if match:
-            print(f"🎃 JSON pattern match: {match.group(1)}")
-            # Return the JSON content found between the delimiters
-            return match.group(1)
-        else:
-            print("🔍 No JSON pattern match found")
-            return response_text
-    except Exception as e:
-        logging.error(f"Error extracting JSON from response: {str(e)}")
-        return response_text
\ No newline at end of file
+    # Plain substring scan first - a bare JSON object or prose never needs the regex
+    match = JSON_BLOCK_PATTERN.search(response_text) if "```json" in response_text else None
+    if match:
+        logging.debug("🎃 JSON pattern match: %s", match.group(1))
+        # Return the JSON content found between the delimiters
+        return match.group(1)
+    logging.debug("🔍 No JSON pattern match found")
+    return response_text
+
+def detect_fast_intent(text: str) -> Optional[Dict]:
+    """
+    Recognize obvious system action requests locally.
+    Returns an action request in the same shape the AI would produce, or None.
+    """
+    match = TIME_IN_PATTERN.search(text)
+    if match:
+        timezone = find_timezone(match.group(1))
+        # Unknown place - let the AI work out the timezone
+        if timezone is None:
+            return None
+        return {"action": "get_time", "parameters": {"timezone": timezone}}
+    
+    if LOCAL_TIME_PATTERN.search(text):
+        return {"action": "get_time", "parameters": {}}
+    
+    if DATE_PATTERN.search(text):
+        return {"action": "get_date", "parameters": {}}
+    
+    if SYSTEM_INFO_PATTERN.search(text):
+        return {"action": "get_system_info", "parameters": {}}
+    
+    return None
\ No newline at end of file
@@ -1,74 +1,127 @@
-from utils.system_utils import get_time, _get_current_timezone, get_system_info, get_location, get_top_processes, basic_commands
-from assistant.tooling.helpers import format_messages_for_openai, extract_json_from_str
-from assistant.news.youtube_channel_monitor import YouTubeChannelMonitor
-from assistant.calendar_handler import CalendarHandler
+from utils.system_utils import get_time, _get_current_timezone, get_system_info, get_location, get_top_processes, basic_commands, SPOKEN_DATE_FORMAT
+from assistant.tooling.helpers import format_messages_for_openai, extract_json_from_str, detect_fast_intent
+from assistant.openai_client import get_openai_client
+from datetime import datetime
+from functools import cached_property, lru_cache
 from typing import Dict
+import logging
+import os
 
+# Send raw system info to the AI to reword instead of the templated summary (for debugging)
+FORCE_LLM_REWRITE = os.getenv("FORCE_LLM_REWRITE") == "1"
+
+@lru_cache(maxsize=1)
+def get_calendar_handler():
+    """Process-wide calendar handler, authenticated on first use"""
+    # Imported on first use - the Google API client is slow to load on the Pi
+    from assistant.calendar_handler import CalendarHandler
+    return CalendarHandler()
+
+@lru_cache(maxsize=1)
+def get_news_monitor():
+    """Process-wide YouTube channel monitor, created on first use"""
+    from assistant.news.youtube_channel_monitor import YouTubeChannelMonitor
+    return YouTubeChannelMonitor()
 
 class ToolingManager:
     def __init__(self):
-        # Widgets
-        self.calendar = CalendarHandler()
-        # TODO - add to news monitor: RSS Feeds (e.g. https://www.infowars.com/rss.xml)
-        self.news_monitor = YouTubeChannelMonitor()
         # Formatting / Helpers
         self.format_messages_for_openai = format_messages_for_openai
         self.extract_json_from_str = extract_json_from_str
+        self.detect_fast_intent = detect_fast_intent
+        # Action name -> handler(parameters), looked up once per request
+        self._action_handlers = {
+            "get_time": self._get_time,
+            "get_date": self._get_date,
+            "get_system_info": self._get_system_info,
+            "get_location": self._get_location,
+            "calendar_next_event": self._calendar_next_event,
+            "calendar_get_events": self._calendar_get_events,
+            "calendar_search": self._calendar_search,
+            "get_top_processes": self._get_top_processes,
+            "get_news": self._get_news,
+        }
         
+    # Widgets - only the calendar and news actions need them, so they're created on first use
+    @cached_property
+    def calendar(self):
+        return get_calendar_handler()
+
+    # TODO - add to news monitor: RSS Feeds (e.g. https://www.infowars.com/rss.xml)
+    @cached_property
+    def news_monitor(self):
+        return get_news_monitor()
         
     def execute_system_action(self, action_request: Dict) -> Dict[str, any]:
         """Execute a system action based on the action request"""
-        action = action_request.get("action")
-        parameters = action_request.get("parameters", {})
-        
-        # Get time
-        if action == "get_time":
-            timezone = parameters.get("timezone", _get_current_timezone())
-            return {"send_direct": True, "result": get_time(timezone)}
-        
-        # Get system info
-        elif action == "get_system_info":
-            system_info = get_system_info()
-            top_processes = get_top_processes(limit=5)
+        handler = self._action_handlers.get(action_request.get("action"))
+        if handler is None:
+            return {"send_direct": False, "result": "Action not recognized"}
+        return handler(action_request.get("parameters") or {})
+    
+    def _get_time(self, parameters: Dict) -> Dict[str, any]:
+        """Get time"""
+        timezone = parameters.get("timezone") or _get_current_timezone()
+        current_time = get_time(timezone)
+        if current_time is None:
+            return {"send_direct": True, "result": "Sorry, I couldn't get the time."}
+        return {"send_direct": True, "result": f"It's {current_time}."}
+    
+    def _get_date(self, parameters: Dict) -> Dict[str, any]:
+        """Get today's date"""
+        return {"send_direct": True, "result": f"Today is {datetime.now().strftime(SPOKEN_DATE_FORMAT)}."}
+    
+    def _get_system_info(self, parameters: Dict) -> Dict[str, any]:
+        """Get system info"""
+        system_info = get_system_info()
+        top_processes = get_top_processes(limit=5)
+        if FORCE_LLM_REWRITE:
             result = f"System Info: {system_info if system_info else 'No system info available'}, Top Processes: {top_processes if top_processes else 'No top processes available'}"
-            # print(f"🔍 {result}")
             return {"send_direct": False, "result": result}
         
-        # Get location
-        elif action == "get_location":
-            return {"send_direct": False, "result": get_location()}
-        
-        # Get next calendar event
-        elif action == "calendar_next_event":
-            return {"send_direct": False, "result": self.calendar.next_event()}
-        
-        # Get events in timeframe
-        elif action == "calendar_get_events":
-            start_time = parameters.get("start_time")
-            end_time = parameters.get("end_time")
-            return {"send_direct": False, "result": self.calendar.get_events(start_time, end_time)}
-        
-        # Search for events
-        elif action == "calendar_search":
-            query = parameters.get("query")
-            return {"send_direct": False, "result": self.calendar.search(query)}
-        
-        # Get top processes
-        elif action == "get_top_processes":
-            limit = parameters.get("limit", 5)
-            return {"send_direct": False, "result": get_top_processes(limit=limit)}
-        
-        # Get latest news
-        elif action == "get_news":
-            latest = self.news_monitor.get_latest_video_transcript()
-            if latest:
-                print(f"\nLatest Video: {latest['title']}")
-                print(f"Published: {latest['published_at']}")
-                print("\nTranscript excerpt:")
-                print(latest['transcript'][:500] + "...")
-                
-            summary = self.news_monitor.summarize_latest_video(self.client)
-            return {"send_direct": True, "result": summary}
-        
-        else:
-            return {"send_direct": False, "result": "Action not recognized"}
\ No newline at end of file
+        # Processes using no CPU (every process, on the first scan) aren't worth naming
+        top_names = ", ".join(
+            process['name'] for process in top_processes['top_cpu']
+            if process['name'] and (process['cpu_percent'] or 0.0) > 0
+        )
+        result = f"CPU is at {system_info['cpu_usage']:.0f}% and memory at {system_info['memory_usage']:.0f}%."
+        if top_names:
+            result += f" Busiest processes: {top_names}."
+        return {"send_direct": True, "result": result}
+    
+    def _get_location(self, parameters: Dict) -> Dict[str, any]:
+        """Get location"""
+        return {"send_direct": True, "result": get_location()}
+    
+    def _calendar_next_event(self, parameters: Dict) -> Dict[str, any]:
+        """Get next calendar event"""
+        event = self.calendar.get_next_event()
+        if event is None:
+            return {"send_direct": True, "result": "You have no upcoming events."}
+        return {"send_direct": True, "result": f"Your next event is {self.calendar.describe_event(event)}."}
+    
+    def _calendar_get_events(self, parameters: Dict) -> Dict[str, any]:
+        """Get events in timeframe"""
+        start_time = parameters.get("start_time")
+        end_time = parameters.get("end_time")
+        return {"send_direct": False, "result": self.calendar.get_events(start_time, end_time)}
+    
+    def _calendar_search(self, parameters: Dict) -> Dict[str, any]:
+        """Search for events"""
+        query = parameters.get("query")
+        return {"send_direct": False, "result": self.calendar.search_events(query)}
+    
+    def _get_top_processes(self, parameters: Dict) -> Dict[str, any]:
+        """Get top processes"""
+        limit = parameters.get("limit", 5)
+        return {"send_direct": False, "result": get_top_processes(limit=limit)}
+    
+    def _get_news(self, parameters: Dict) -> Dict[str, any]:
+        """Get latest news"""
+        latest = self.news_monitor.get_latest_video_transcript()
+        if latest:
+            logging.debug("Latest Video: %s, Published: %s", latest['title'], latest['published_at'])
+            logging.debug("Transcript excerpt: %s...", latest['transcript'][:500])
+            
+        summary = self.news_monitor.summarize_latest_video(get_openai_client())
+        return {"send_direct": True, "result": summary}
\ No newline at end of file
@@ -1,6 +1,27 @@
 import speech_recognition as sr
 from datetime import datetime
+import json
 import logging
+import os
+import re
+import threading
+
+# Whisper model (e.g. "tiny.en") to recognize speech on-device, with no network round-trip.
+# Unset to use Google's web API, which is also the fallback if local recognition fails.
+LOCAL_SPEECH_MODEL = os.getenv("LOCAL_SPEECH_MODEL")
+
+# Built-in commands in priority order, each with the words that trigger it
+COMMAND_KEYWORDS = (
+    ("time", frozenset({"time"})),
+    ("kayden", frozenset({"kayden", "caden"})),
+    ("hello", frozenset({"hello"})),
+    ("exit", frozenset({"exit", "quit", "goodbye"})),
+    ("weather", frozenset({"weather"})),
+)
+# Words of a command, read in one pass (ignoring the punctuation Whisper adds)
+WORD_PATTERN = re.compile(r"[a-z']+")
+# Last calibrated microphone energy threshold, reused at startup instead of calibrating again
+ENERGY_THRESHOLD_FILE = "energy_threshold.json"
 
 # TODO: add wake word detection
 # TODO: use openai whisper?
@@ -8,14 +29,38 @@ class VoiceRecognizer:
     def __init__(self):
         self.recognizer = sr.Recognizer()
         self.microphone = sr.Microphone()
+        # The microphone can only be opened by one thread at a time
+        self._microphone_lock = threading.Lock()
+        self.recognizer.dynamic_energy_threshold = True
 
-        with self.microphone as source:
-            self.recognizer.adjust_for_ambient_noise(source)
-            logging.info("Adjusting for ambient noise. Please speak now.")
-            self.recognizer.dynamic_energy_threshold = True
-            self.recognizer.energy_threshold = 300
+        threshold = self._load_energy_threshold()
+        if threshold is not None:
+            # Calibrated on an earlier run - the dynamic threshold adapts from there
+            self.recognizer.energy_threshold = threshold
+        else:
+            # Calibrate off the startup path; listen() waits for it if called first
+            threading.Thread(target=self._calibrate, daemon=True).start()
 
         logging.info("Jarvis initialized.")
+
+    def _load_energy_threshold(self):
+        """The energy threshold saved by the last calibration, if any"""
+        try:
+            with open(ENERGY_THRESHOLD_FILE) as f:
+                return float(json.load(f)["threshold"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _calibrate(self):
+        """Set the energy threshold from the ambient noise, and save it for the next run"""
+        try:
+            with self._microphone_lock, self.microphone as source:
+                logging.info("Adjusting for ambient noise. Please speak now.")
+                self.recognizer.adjust_for_ambient_noise(source)
+            with open(ENERGY_THRESHOLD_FILE, "w") as f:
+                json.dump({"threshold": self.recognizer.energy_threshold}, f)
+        except Exception as e:
+            logging.error(f"Error adjusting for ambient noise: {e}")
         
     def listen(self):
         """Listen for a single phrase and return the text."""
@@ -24,10 +69,10 @@ class VoiceRecognizer:
         try:
             # TODO: add wake word detection?
             # TODO: is there a way to make this non-blocking?
-            with self.microphone as source:
+            with self._microphone_lock, self.microphone as source:
                 # print("Listening... 🎧")
                 audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=None) # 15 was too short
-            text = self.recognizer.recognize_google(audio)
+            text = self._recognize(audio)
             print("🫵 You said: ", text) if text else None
             
         except sr.WaitTimeoutError:
@@ -42,24 +87,37 @@ class VoiceRecognizer:
 
         return text.lower() if text else ""
 
+    def _recognize(self, audio):
+        """Transcribe captured audio, locally if LOCAL_SPEECH_MODEL is set"""
+        if LOCAL_SPEECH_MODEL:
+            try:
+                # The model is loaded on first use and kept by the recognizer
+                return self.recognizer.recognize_whisper(
+                    audio, model=LOCAL_SPEECH_MODEL, language="english", fp16=False
+                ).strip()
+            except Exception as e:
+                logging.error(f"Local speech recognition failed, using Google: {e}")
+        return self.recognizer.recognize_google(audio)
+
     def is_wake_word(self, text, wake_word="jarvis"):
         return wake_word.lower() in text.lower()
 
     def process_command(self, text):
         """Command processing."""
-        text = text.lower()
+        words = set(WORD_PATTERN.findall(text.lower()))
+        command = next((name for name, keywords in COMMAND_KEYWORDS if keywords & words), None)
         
-        if "time" in text:
+        if command == "time":
             return f"The time is {datetime.now().strftime('%I:%M %p')}"
-        elif "kayden" in text or "caden" in text:
+        elif command == "kayden":
             return "Hello, Kayden!"
-        elif "hello" in text:
+        elif command == "hello":
             return "Hello, how can I assist you today Mr. Clac?"
-        elif "exit" in text or "quit" in text or "goodbye" in text:
+        elif command == "exit":
             return "Goodbye Mr. Clac!"
-        elif "weather" in text:
-            return self.get_weather() if self.get_weather() else "I couldn't fetch the weather data."
-        elif self.is_wake_word(text):
+        elif command == "weather":
+            return self.get_weather() or "I couldn't fetch the weather data."
+        elif "jarvis" in words:
             return "What up dog?"
         else:
             return "i am so dumb so please be dumb for me"
\ No newline at end of file
@@ -1,8 +1,39 @@
 # src/gui/ui_handler.py
 
+import time
 import tkinter as tk
+from collections import deque
 from tkinter import ttk
-import random
+import numpy as np
+from PIL import Image, ImageDraw, ImageTk
+
+# Random source for the lightning animation
+_rng = np.random.default_rng()
+# Lightning line: x position (center of the canvas), length, and number of segments in the line
+LIGHTNING_X = 150
+LIGHTNING_HEIGHT = 300
+LIGHTNING_SEGMENTS = 20
+# Lightning animation frame rate, and the lower one while the assistant is idle
+LIGHTNING_FPS = 10
+IDLE_LIGHTNING_FPS = 2
+# Recent frames whose drawing time is averaged to schedule the next one
+FRAME_COST_SAMPLES = 100
+# The animation pauses after this long idle with nothing new in the transcript (seconds)
+IDLE_ANIMATION_TIMEOUT = 30
+# How often a paused animation (idle, or window not visible) checks whether to resume (ms)
+PAUSED_ANIMATION_POLL_MS = 250
+# Max transcript lines kept on screen - the oldest are dropped beyond this
+MAX_TRANSCRIPT_LINES = 200
+# Transcript speaker labels, by whether the user said it
+USER_PREFIX = "You: "
+ASSISTANT_PREFIX = "Jarvis: "
+# Status label text for each state
+STATUS_TEXTS = {
+    'idle': 'Ready',
+    'listening': 'Listening...',
+    'processing': 'Processing...',
+    'speaking': 'Speaking...'
+}
 
 class AssistantUI:
     def __init__(self, window_title="Jarviz"):
@@ -21,7 +52,13 @@ class AssistantUI:
         }
         
         self.current_state = 'idle'
+        # Color the lightning is drawn in - follows the state, changed only when the state's color does
+        self.current_color = self.states['idle']
         self.is_running = True
+        # Time spent drawing recent lightning frames (seconds)
+        self._frame_costs = deque(maxlen=FRAME_COST_SAMPLES)
+        # Last state change or transcript update (monotonic seconds)
+        self._last_activity = time.monotonic()
         
         self._setup_ui()
         # self._animate_pulse()
@@ -38,6 +75,18 @@ class AssistantUI:
         )
         self.canvas.pack(pady=20)
         
+        # Lightning line's points as flat x, y coordinates - only the inner points' x positions change
+        segment_length = LIGHTNING_HEIGHT / LIGHTNING_SEGMENTS
+        self._lightning_coords = [
+            coordinate
+            for i in range(LIGHTNING_SEGMENTS + 1)
+            for coordinate in (LIGHTNING_X, i * segment_length)
+        ]
+        # A single polyline item, created once and moved every frame
+        self._lightning_item = self.canvas.create_line(
+            *self._lightning_coords, fill=self.current_color, width=2, tags="lightning"
+        )
+        
         # Status label
         self.status_var = tk.StringVar(value="Ready")
         self.status_label = ttk.Label(
@@ -65,32 +114,27 @@ class AssistantUI:
         button_frame = tk.Frame(self.r, bg='#1e1e1e')
         button_frame.pack(pady=(0, 10))
 
-        # Stop button
-        self.stop_button_canvas = tk.Canvas(
+        # Stop button - a circular red button with a square in the middle, drawn once as a single image
+        stop_image = Image.new("RGBA", (41, 41), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(stop_image)
+        draw.ellipse((0, 0, 40, 40), fill='red', outline='red')
+        draw.rectangle((15, 15, 25, 25), fill='white', outline='white')
+        # Kept on self - Tk doesn't hold a reference, so the image would be garbage collected
+        self._stop_image = ImageTk.PhotoImage(stop_image)
+
+        self.stop_button = tk.Label(
             button_frame,
-            width=50,
-            height=50,
+            image=self._stop_image,
             bg='#1e1e1e',
+            padx=4,
+            pady=4,
+            borderwidth=0,
             highlightthickness=0
         )
-        self.stop_button_canvas.pack(side=tk.LEFT, padx=(0, 10))
+        self.stop_button.pack(side=tk.LEFT, padx=(0, 10))
 
-        # Draw circular red button
-        self.stop_button_canvas.create_oval(
-            5, 5, 45, 45,
-            fill='red',
-            outline='red'
-        )
-
-        # Draw square in the middle
-        self.stop_button_canvas.create_rectangle(
-            20, 20, 30, 30,
-            fill='white',
-            outline='white'
-        )
-
-        # Bind click event to the canvas
-        self.stop_button_canvas.bind("<Button-1>", lambda event: self.on_stop_button_pressed())
+        # Bind click event to the button
+        self.stop_button.bind("<Button-1>", lambda event: self.on_stop_button_pressed())
 
         # Exit button
         self.exit_button = ttk.Button(
@@ -151,41 +195,35 @@ class AssistantUI:
         """Animate a vertical line with a lightning effect"""
         if self.is_running:
             try:
-                # Clear previous line
-                self.canvas.delete("lightning")
-                
-                # Draw "lightning" line
-                x = 150  # Center of the canvas
-                y_start = 0
-                y_end = 300
-                segments = 20  # Number of segments in the line
-                segment_length = (y_end - y_start) / segments
+                # Nothing to see - minimized/hidden, or idle for a while
+                if not self.canvas.winfo_viewable() or (
+                    self.current_state == 'idle'
+                    and time.monotonic() - self._last_activity > IDLE_ANIMATION_TIMEOUT
+                ):
+                    self.r.after(PAUSED_ANIMATION_POLL_MS, self._animate_lightning)
+                    return
                 
-                points = [(x, y_start)]
+                frame_start = time.perf_counter()
                 
+                # Draw "lightning" line
                 # Determine offset range based on current state
                 if self.current_state in ['listening']:
                     offset_range = (-2, 2)  # Smaller movement
                 else:
                     offset_range = (-30, 30)  # Larger movement
                 
-                for i in range(1, segments):
-                    # Randomly offset the x position to create a jagged effect
-                    offset = random.randint(*offset_range)
-                    points.append((x + offset, y_start + i * segment_length))
-                
-                points.append((x, y_end))
+                # Randomly offset the inner points' x positions to create a jagged effect, all at once
+                offsets = _rng.integers(*offset_range, size=LIGHTNING_SEGMENTS - 1, endpoint=True)
+                self._lightning_coords[2:-2:2] = (LIGHTNING_X + offsets).tolist()
                 
-                # Draw the line segments
-                for i in range(len(points) - 1):
-                    self.canvas.create_line(
-                        points[i][0], points[i][1],
-                        points[i+1][0], points[i+1][1],
-                        fill="cyan", width=2, tags="lightning"
-                    )
+                # Move the whole line in one call
+                self.canvas.coords(self._lightning_item, self._lightning_coords)
                 
-                # Schedule the next frame
-                self.r.after(100, self._animate_lightning)  # 100ms delay for animation
+                # Schedule the next frame, net of the usual drawing time so the frame rate holds on a slow Pi
+                self._frame_costs.append(time.perf_counter() - frame_start)
+                fps = IDLE_LIGHTNING_FPS if self.current_state == 'idle' else LIGHTNING_FPS
+                delay = 1 / fps - sum(self._frame_costs) / len(self._frame_costs)
+                self.r.after(max(1, int(delay * 1000)), self._animate_lightning)
                 
             except tk.TclError:
                 print("Tkinter error in _animate_lightning")
@@ -196,18 +234,28 @@ class AssistantUI:
         """Set the current state and update UI"""
         if state in self.states:
             self.current_state = state
+            self._last_activity = time.monotonic()
+            color = self.states[state]
+            if color != self.current_color:
+                self.current_color = color
+                self.canvas.itemconfigure(self._lightning_item, fill=color)
             # print(f"State changed to: {self.current_state}")  # Debugging print
-            status_texts = {
-                'idle': 'Ready',
-                'listening': 'Listening...',
-                'processing': 'Processing...',
-                'speaking': 'Speaking...'
-            }
-            self.status_var.set(status_texts[state])
+            self.status_var.set(STATUS_TEXTS[state])
             
     def update_transcript(self, text, is_user=True):
         """Update the transcript display"""
-        self.transcript.insert(tk.END, f"{'You' if is_user else 'Jarvis'}: {text}\n")
+        self.update_transcript_batch([(text, is_user)])
+        
+    def update_transcript_batch(self, items):
+        """Add several (text, is_user) messages to the transcript display at once"""
+        self._last_activity = time.monotonic()
+        self.transcript.insert(tk.END, "".join(
+            f"{USER_PREFIX if is_user else ASSISTANT_PREFIX}{text}\n" for text, is_user in items
+        ))
+        # Keep the transcript bounded; the widget always ends with an empty line
+        excess = int(self.transcript.index("end-1c").split(".")[0]) - 1 - MAX_TRANSCRIPT_LINES
+        if excess > 0:
+            self.transcript.delete("1.0", f"{excess + 1}.0")
         self.transcript.see(tk.END)  # Scroll to bottom
         
     def clear_transcript(self):
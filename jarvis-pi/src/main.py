@@ -1,8 +1,9 @@
 import logging
+import re
 import signal
 import sys
 import time
-import threading
+from concurrent.futures import ThreadPoolExecutor
 from gui.ui_handler import AssistantUI
 from assistant.text_to_speech import TextToSpeech
 from assistant.voice_recognition import VoiceRecognizer
@@ -10,6 +11,11 @@ from assistant.command_processor import CommandProcessor
 # from assistant.memory.integrated_memory_system import IntegratedMemorySystem
 from assistant.memory.basic_memory import BasicMemory
 
+# A response containing one of these words ends the session
+EXIT_PATTERN = re.compile(r"\b(?:goodbye|exit|quit)\b", re.IGNORECASE)
+# Pause after speech before listening, so the tail still in the audio device's buffer isn't heard (seconds)
+POST_SPEECH_DELAY = 0.25
+
 class Jarvis:
     def __init__(self):
         logging.basicConfig(level=logging.INFO)
@@ -18,11 +24,18 @@ class Jarvis:
         self.tts = TextToSpeech()
         self.ui = AssistantUI()
         self.is_running = True
-        self.voice_thread = None
+        # One reused thread listens for and processes commands, one at a time
+        self._listen_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="listen")
+        self._listen_future = None
         
         # Callback to stop the assistant's active TTS
         self.ui.stop_callback = self.stop
         self.ui.exit_callback = self.cleanup
+        # Posted by the voice thread when it's done with a command, and by TTS when it's done speaking,
+        # to listen for the next command
+        self.ui.r.bind("<<ListenDone>>", self.main_loop)
+        self.ui.r.bind("<<TTSDone>>", self.main_loop)
+        self.tts.done_callback = self._on_speech_done
 
         # Initialize memory systems
         # self.memory_system = IntegratedMemorySystem()
@@ -35,9 +48,18 @@ class Jarvis:
         self.ui.set_state("speaking")
         self.ui.update_transcript(text)
         self.tts.speak(text, voice=voice)
+        self.wait_for_speech()
+
+    def speak_sentence(self, sentence, voice="onyx"):
+        """Queue one sentence of a streamed response for playback"""
+        self.ui.set_state("speaking")
+        self.tts.speak(sentence, voice=voice)
+
+    def wait_for_speech(self):
+        """Block until queued speech has played"""
         self.tts.wait_until_done()
         # Add extra delay after speaking to avoid echo
-        time.sleep(1.0)
+        time.sleep(POST_SPEECH_DELAY)
         self.ui.set_state("idle")
 
     def run(self):
@@ -59,26 +81,39 @@ class Jarvis:
             self.speak_and_wait("I wasn't talking, chill")
         # self.is_running = False
         
-    def main_loop(self):
-        """Main loop task scheduled with Tkinter's `after` method"""
+    def main_loop(self, event=None):
+        """
+        Start listening for the next command
+        Runs on the Tk thread at startup and on each <<ListenDone>> / <<TTSDone>>, instead of polling.
+        """
         if self.is_running:
             try:
                 if not self.tts.is_speaking:
-                    self.ui.set_state("listening")
-                    
                     # Start listening in a separate thread
-                    if self.voice_thread is None or not self.voice_thread.is_alive():
-                        self.voice_thread = threading.Thread(target=self.listen_and_process)
-                        self.voice_thread.start()
+                    if self._listen_future is None or self._listen_future.done():
+                        self.ui.set_state("listening")
+                        self._listen_future = self._listen_pool.submit(self.listen_and_process)
+                        # Posted from a done callback, so main_loop already sees this listen as finished
+                        self._listen_future.add_done_callback(self._on_listen_done)
                         
                 else:
+                    # Still speaking (e.g. after the stop button) - <<TTSDone>> brings us back
                     self.ui.set_state("idle")
                             
             except Exception as e:
                 logging.error(f"Error in main loop: {e}")
-            
-            # Reschedule the main loop task
-            self.ui.r.after(100, self.main_loop)
+                
+    def _on_speech_done(self):
+        """Have the Tk thread listen again once speech is over (called on the TTS playback thread)"""
+        if self.is_running:
+            self.ui.r.event_generate("<<TTSDone>>", when="tail")
+                
+    def _on_listen_done(self, future):
+        """Have the Tk thread listen again (called on the listen thread once its Future is done)"""
+        if not future.cancelled() and future.exception() is not None:
+            logging.error(f"Error processing command: {future.exception()}")
+        if self.is_running:
+            self.ui.r.event_generate("<<ListenDone>>", when="tail")
                 
     def listen_and_process(self):
         """Listen for command and process it"""
@@ -90,10 +125,12 @@ class Jarvis:
             self.ui.set_state("processing")
             
             context = self.memory_system.get_recent_interactions(limit=5)
-            print(f"👀 Context: {context}")
+            logging.debug("👀 Context: %s", context)
             
-            # Process command and get response
-            response = self.command_processor.process_command(text, context)
+            # Process command, speaking the response as it streams in
+            response = self.command_processor.process_command(
+                text, context, on_sentence=self.speak_sentence
+            )
             
             # Store interaction in memory system
             self.memory_system.add_interaction(
@@ -102,13 +139,14 @@ class Jarvis:
                 assistant_response=response
             )
             
-            # Speak response
+            # Finish speaking response
             print(f"User: {text}")
             print(f"JARVIS: {response}")
-            self.speak_and_wait(response)
+            self.ui.update_transcript(response)
+            self.wait_for_speech()
             
             # Check for exit command
-            if any(word in response.lower() for word in ["goodbye", "exit", "quit"]):
+            if EXIT_PATTERN.search(response):
                 self.cleanup()
         else:
             self.ui.set_state("idle")
@@ -117,6 +155,7 @@ class Jarvis:
         """Cleanup resources and exit gracefully"""
         print("\nShutting down JARVIS...")
         self.is_running = False
+        self._listen_pool.shutdown(wait=False)
         self.tts.cleanup()
         self.ui.cleanup()
         sys.exit(0)
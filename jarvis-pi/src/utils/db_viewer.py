@@ -9,6 +9,12 @@ class DBViewer(tk.Tk):
         super().__init__()
         
         self.db_path = db_path
+        # (max id, row count) of the memories shown, to skip refreshes when nothing changed
+        self._last_state = None
+        # One read-only connection for the life of the window, not one per refresh / click
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA query_only=1")
         self.title(f"SQLite Viewer - {db_path}")
         self.geometry("800x600")
         
@@ -55,19 +61,33 @@ class DBViewer(tk.Tk):
         self.after(5000, self.auto_refresh)  # Schedule next refresh
     
     def refresh_data(self):
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        cursor = self.conn.cursor()
         
-        # Connect to database
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        # Nothing changed since the last refresh - keep the tree as is
+        cursor.execute("SELECT MAX(id), COUNT(*) FROM memories")
+        state = tuple(cursor.fetchone())
+        if state == self._last_state:
+            return
         
         # Get column names
         cursor.execute("PRAGMA table_info(memories)")
         columns = [col[1] for col in cursor.fetchall()]
         
+        # Only rows were added - insert just those, above the rest
+        if self._last_state is not None and columns == list(self.tree["columns"]):
+            last_max_id, last_count = self._last_state
+            cursor.execute("SELECT * FROM memories WHERE id > ? ORDER BY id", (last_max_id or 0,))
+            new_rows = cursor.fetchall()
+            if last_count + len(new_rows) == state[1]:
+                for row in new_rows:
+                    self.tree.insert("", 0, values=self._display_values(row, columns))
+                self._last_state = state
+                return
+        
+        # Clear existing items
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        
         # Configure columns in treeview
         self.tree["columns"] = columns
         for col in columns:
@@ -80,23 +100,26 @@ class DBViewer(tk.Tk):
         
         # Insert data
         for row in rows:
-            values = []
-            for col in columns:
-                val = row[col]
-                # Format certain columns for better display
-                if col == 'embedding':
-                    val = f"<binary {len(val)} bytes>"
-                elif col == 'metadata':
-                    try:
-                        val = json.loads(val)
-                        val = f"<metadata: {len(val)} keys>"
-                    except:
-                        val = "<invalid metadata>"
-                values.append(val)
-            
-            self.tree.insert("", "end", values=values)
+            self.tree.insert("", "end", values=self._display_values(row, columns))
         
-        conn.close()
+        self._last_state = state
+    
+    def _display_values(self, row, columns):
+        """Tree values for a row"""
+        values = []
+        for col in columns:
+            val = row[col]
+            # Format certain columns for better display
+            if col == 'embedding':
+                val = f"<binary {len(val)} bytes>"
+            elif col == 'metadata':
+                try:
+                    val = json.loads(val)
+                    val = f"<metadata: {len(val)} keys>"
+                except:
+                    val = "<invalid metadata>"
+            values.append(val)
+        return values
     
     def show_details(self, event):
         # Clear previous details
@@ -110,10 +133,8 @@ class DBViewer(tk.Tk):
         # Get all values
         values = self.tree.item(selection[0])['values']
         
-        # Connect to database to get raw data
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        # Get raw data
+        cursor = self.conn.cursor()
         
         cursor.execute("SELECT * FROM memories WHERE id=?", (values[0],))
         row = cursor.fetchone()
@@ -134,8 +155,10 @@ class DBViewer(tk.Tk):
                 details.append(f"{key}:\n{value}\n")
             
             self.detail_text.insert(1.0, "\n".join(details))
-        
-        conn.close()
+    
+    def destroy(self):
+        self.conn.close()
+        super().destroy()
 
 if __name__ == "__main__":
     viewer = DBViewer("semantic_memory.db")
@@ -1,93 +1,241 @@
-import pytz
+import heapq
 import logging
+import os
 import platform
 import psutil
+import threading
+import time
 from datetime import datetime
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, Optional
+from zoneinfo import ZoneInfo, available_timezones
 
 # Initialize a cache variable
 _cached_timezone = None
+# Whether _cached_timezone was read from the OS configuration (False when it's the UTC fallback),
+# i.e. whether it's the zone the C library's local time is in
+_timezone_resolved = False
+# City name -> 'Region/City' timezone, built on first lookup
+_timezones_by_city = None
+# Top-level regions of city timezones (leaving out aliases like 'US/Eastern' and 'Etc/GMT+5')
+TIMEZONE_REGIONS = {"Africa", "America", "Antarctica", "Asia", "Atlantic", "Australia", "Europe", "Indian", "Pacific"}
+# OS name / version never change while running
+_os_name = platform.system()
+_os_version = platform.version()
+# (pid, start time) -> CPU seconds used, at the last /proc process scan (monotonic seconds)
+_process_cpu_times = {}
+_process_scan_time = None
+# Serializes process scans - both the /proc scan's previous sample and psutil's process_iter cache are shared
+_process_scan_lock = threading.Lock()
+# Latest CPU / memory usage, refreshed by the background sampler
+_cpu_usage = 0.0
+_memory_usage = 0.0
+# Total memory (bytes), from the same sample - shared with the process scan
+_memory_total = None
 
-def get_time(timezone: str) -> str:
-    """Get current time in specified timezone"""
+# How often the background sampler measures CPU / memory usage (seconds)
+USAGE_SAMPLE_INTERVAL = 1.0
+# Format of humanized timestamps, e.g. 2024-11-05 03:30 PM
+HUMAN_TIME_FORMAT = "%Y-%m-%d %I:%M %p"
+# Format of get_time's reply, e.g. 03:30 PM EST
+TIME_FORMAT = "%I:%M %p %Z"
+# Format of the "date" basic command's reply
+DATE_FORMAT = "%Y-%m-%d"
+# Format of the get_date action's reply, e.g. Tuesday, November 05, 2024
+SPOKEN_DATE_FORMAT = "%A, %B %d, %Y"
+# On Linux, top processes are read from /proc/<pid>/stat directly - one file per process
+PROC_STAT_SCAN = _os_name == "Linux"
+if PROC_STAT_SCAN:
+    # Units of /proc/<pid>/stat CPU times and RSS
+    CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+def _sample_usage():
+    """Keep CPU / memory usage fresh so callers never block on `cpu_percent`"""
+    global _cpu_usage, _memory_usage, _memory_total
+    
+    while True:
+        try:
+            # Blocks for the interval on this thread only, giving a meaningful reading
+            _cpu_usage = psutil.cpu_percent(interval=USAGE_SAMPLE_INTERVAL)
+            memory = psutil.virtual_memory()
+            _memory_usage, _memory_total = memory.percent, memory.total
+        except Exception as e:
+            logging.error(f"Error sampling system usage: {e}")
+            # Keep sampling - a transient failure mustn't leave the readings stale for good
+            time.sleep(USAGE_SAMPLE_INTERVAL)
+
+threading.Thread(target=_sample_usage, name="usage-sampler", daemon=True).start()
+
+@lru_cache(maxsize=128)
+def _tz(name: str) -> ZoneInfo:
+    """Cached tzinfo lookup, from the OS timezone database"""
+    return ZoneInfo(name)
+
+def _is_timezone(name: str) -> bool:
+    """Whether `name` is a timezone in the OS timezone database"""
     try:
-        if timezone:
-            tz = pytz.timezone(timezone)
-        else:
-            tz = pytz.timezone(_get_current_timezone())
-        print(f"🔍 Timezone: {tz}")
-        current_time = datetime.now(tz)
-        return current_time.strftime("%I:%M %p %Z")
-    except Exception as e:
-        logging.error(f"Error getting time: {e}")
+        _tz(name)
+        return True
+    except (KeyError, ValueError, OSError):
+        # ZoneInfoNotFoundError is a KeyError; empty or malformed names raise ValueError
+        return False
+
+def get_time(timezone: str) -> str:
+    """Get current time in specified timezone (None if the timezone is unknown)"""
+    # Local time straight from the C library - no tzinfo or datetime needed
+    if not timezone or (timezone == _get_current_timezone() and _timezone_resolved):
+        return time.strftime(TIME_FORMAT, time.localtime())
+    
+    # Validated up front (and cached), so formatting needs no error handling
+    if not _is_timezone(timezone):
+        logging.error(f"Error getting time: unknown timezone {timezone}")
         return None
+    return _format_time(_tz(timezone))
+
+def _format_time(tz: ZoneInfo) -> str:
+    """Current time in `tz`"""
+    logging.debug("🔍 Timezone: %s", tz)
+    return datetime.now(tz).strftime(TIME_FORMAT)
 
 def _get_current_timezone() -> str:
     """Get system's current timezone in 'Region/City' format, with caching."""
-    global _cached_timezone
+    global _cached_timezone, _timezone_resolved
     
     if _cached_timezone is not None:
         return _cached_timezone
     
-    # Get the current time with timezone info
-    current_time = datetime.now().astimezone()
-    # Find the timezone name using pytz
-    for tz in pytz.all_timezones:
-        if datetime.now(pytz.timezone(tz)).utcoffset() == current_time.utcoffset():
-            _cached_timezone = tz
-            return tz
+    # Read the zone name from the OS configuration, instead of testing every zone's offset
+    candidates = [os.environ.get("TZ", "").lstrip(":")]
+    try:
+        # Debian / Raspberry Pi OS
+        with open("/etc/timezone") as f:
+            candidates.append(f.read().strip())
+    except OSError:
+        pass
+    try:
+        # Symlink to e.g. /usr/share/zoneinfo/America/New_York
+        candidates.append(os.readlink("/etc/localtime").split("zoneinfo/", 1)[-1])
+    except OSError:
+        pass
     
-    _cached_timezone = "UTC"  # Fallback to UTC if no match is found
+    resolved = next((tz for tz in candidates if _is_timezone(tz)), None)
+    _timezone_resolved = resolved is not None
+    _cached_timezone = resolved or "UTC"  # Fallback to UTC if not configured
     return _cached_timezone
 
+def find_timezone(city: str) -> Optional[str]:
+    """Find the 'Region/City' timezone for a city name, e.g. 'new york' -> 'America/New_York'"""
+    global _timezones_by_city
+    
+    if _timezones_by_city is None:
+        _timezones_by_city = {
+            tz.rsplit('/', 1)[-1].lower(): tz
+            for tz in sorted(available_timezones())
+            if tz.split('/', 1)[0] in TIMEZONE_REGIONS
+        }
+    return _timezones_by_city.get(city.strip().lower().replace(' ', '_'))
+
 def get_system_info() -> Dict[str, Any]:
-    print("🔍 Getting system info")
     """Get system information"""
+    logging.debug("🔍 Getting system info")
     return {
-        "os": platform.system(),
-        "version": platform.version(),
-        "cpu_usage": psutil.cpu_percent(),
-        "memory_usage": psutil.virtual_memory().percent
+        "os": _os_name,
+        "version": _os_version,
+        "cpu_usage": _cpu_usage,
+        "memory_usage": _memory_usage
     }
 
 def get_location() -> Dict[str, Any]:
-    print("🔍 Getting location 🌎")
     """
     Get system location
     -- Not sure if this is a reliable approach
     """
+    logging.debug("🔍 Getting location 🌎")
     # TODO: Get location
     return "Somewhere over the rainbow"
 
 def get_top_processes(limit=5):
     """Get top processes by CPU and memory usage."""
-    print("🔍 Getting top processes")
-    processes = []
-    for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-        try:
-            if proc.info['cpu_percent'] is not None or proc.info['memory_percent'] is not None:
-                processes.append(proc.info)
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            continue
+    logging.debug("🔍 Getting top processes")
+    with _process_scan_lock:
+        if PROC_STAT_SCAN:
+            processes = _scan_proc_stat()
+        else:
+            # Unreadable values come back as None - the sort keys below count them as 0
+            processes = [proc.info for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent'])]
 
-    # Sort by CPU and memory usage
-    top_cpu = sorted(processes, key=lambda x: x['cpu_percent'], reverse=True)[:limit]
-    top_memory = sorted(processes, key=lambda x: x['memory_percent'], reverse=True)[:limit]
+    # Top by CPU and memory usage - a partial heap, no need to sort every process
+    top_cpu = heapq.nlargest(limit, processes, key=lambda x: x['cpu_percent'] or 0.0)
+    top_memory = heapq.nlargest(limit, processes, key=lambda x: x['memory_percent'] or 0.0)
 
     return {
         "top_cpu": top_cpu,
         "top_memory": top_memory
     }
 
-def humanize_time(timestamp: str) -> str:
-    """Humanize a timestamp"""
-    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %I:%M %p")
+def _scan_proc_stat():
+    """
+    pid, name, CPU and memory usage of every process, from a single read of its /proc/<pid>/stat
+    CPU usage is since the last scan (0 on the first one), like psutil's `cpu_percent`.
+    """
+    global _process_cpu_times, _process_scan_time
+    
+    # Reuse the background sampler's memory reading rather than reading /proc/meminfo again
+    memory_total = _memory_total or psutil.virtual_memory().total
+    now = time.monotonic()
+    elapsed = now - _process_scan_time if _process_scan_time is not None else 0.0
+    
+    processes = []
+    cpu_times = {}
+    for pid in psutil.pids():
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            # Exited since listing, or not readable
+            continue
+        # The name is in parentheses and may itself contain spaces or parentheses
+        name_end = stat.rindex(b")")
+        name = stat[stat.index(b"(") + 1:name_end].decode(errors="replace")
+        # Fields after the name, from field 3 (state): utime 14, stime 15, starttime 22, rss 24
+        fields = stat[name_end + 2:].split()
+        key = (pid, fields[19])
+        cpu_times[key] = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        previous = _process_cpu_times.get(key)
+        processes.append({
+            "pid": pid,
+            "name": name,
+            "cpu_percent": round(100 * (cpu_times[key] - previous) / elapsed, 1) if previous is not None and elapsed else 0.0,
+            "memory_percent": 100 * int(fields[21]) * PAGE_SIZE / memory_total
+        })
+    
+    _process_cpu_times, _process_scan_time = cpu_times, now
+    return processes
 
+def humanize_time(timestamp: float) -> str:
+    """Humanize a Unix timestamp (seconds)"""
+    # Formatted from the C library's broken-down time, no datetime object needed
+    return time.strftime(HUMAN_TIME_FORMAT, time.localtime(timestamp))
+
+# Replies to basic commands that never change
+BASIC_REPLIES = {
+    "hello": "At your service, wadup!",
+    "goodbye": "Alright, peace!",
+    "exit": "Shutting down.",
+    "quit": "Shutting it down."
+}
+
+# Basic commands whose reply is computed when asked
 basic_commands = {
-    "time": lambda: get_time(),
-    "date": lambda: datetime.now().strftime("%Y-%m-%d"),
-    "hello": lambda: "At your service, wadup!",
-    "goodbye": lambda: "Alright, peace!",
-    "exit": lambda: "Shutting down.",
-    "quit": lambda: "Shutting it down."
-} 
\ No newline at end of file
+    "time": lambda: get_time(None),
+    "date": lambda: datetime.now().strftime(DATE_FORMAT)
+}
+
+def basic_command_reply(command: str) -> Optional[str]:
+    """Local reply to a basic command, or None if `command` isn't one (or its reply failed)"""
+    reply = BASIC_REPLIES.get(command)
+    if reply is None:
+        handler = basic_commands.get(command)
+        reply = handler() if handler is not None else None
+    return reply 
\ No newline at end of file
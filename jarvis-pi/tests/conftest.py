@@ -0,0 +1,46 @@
+# tests/conftest.py
+
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Modules import each other as top-level packages (`assistant.*`, `utils.*`), as when run from src/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from assistant import embedding_model  # noqa: E402
+
+class FakeEmbeddingModel:
+    """Deterministic bag-of-words stand-in for the sentence transformer - no weights to download"""
+    dimension = 32
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def _embed(self, text):
+        embedding = np.zeros(self.dimension, dtype=np.float32)
+        for word in text.lower().split():
+            embedding[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dimension] += 1
+        return embedding
+
+    def encode(self, texts, normalize_embeddings=False, **kwargs):
+        single = isinstance(texts, str)
+        embeddings = np.array([self._embed(text) for text in ([texts] if single else texts)], dtype=np.float32)
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.where(norms > 0, norms, 1)
+        return embeddings[0] if single else embeddings
+
+@pytest.fixture
+def fake_embedding_model():
+    """Serve FakeEmbeddingModel from get_embedding_model() for the duration of a test"""
+    model = FakeEmbeddingModel()
+    with embedding_model._models_lock:
+        saved = dict(embedding_model._models)
+        embedding_model._models[embedding_model.DEFAULT_EMBEDDING_MODEL] = model
+    yield model
+    with embedding_model._models_lock:
+        embedding_model._models.clear()
+        embedding_model._models.update(saved)
@@ -0,0 +1,117 @@
+# tests/test_basic_memory.py
+
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from assistant.memory.basic_memory import BasicMemory
+
+def _insert(memory, user_message, assistant_response, timestamp_ms):
+    """Store an interaction with a fixed timestamp, so result order is deterministic"""
+    with memory.get_db_connection(for_writing=True) as conn:
+        conn.execute(
+            "INSERT INTO interactions (user_id, user_message, assistant_response, timestamp) VALUES (?, ?, ?, ?)",
+            ("user", user_message, assistant_response, timestamp_ms)
+        )
+
+@pytest.fixture
+def memory(tmp_path):
+    memory = BasicMemory(str(tmp_path / "memory.db"))
+    _insert(memory, "what's the weather like", "Sunny and 20 degrees.", 1_000)
+    _insert(memory, "play some jazz", "Playing jazz.", 2_000)
+    _insert(memory, "will it rain tomorrow", "No rain in the weather forecast.", 3_000)
+    return memory
+
+def test_migrates_text_timestamps_to_epoch_milliseconds(tmp_path):
+    path = tmp_path / "memory.db"
+    stored = datetime(2024, 11, 1, 10, 20, 30)
+    # Table and values as stored before timestamps were epoch milliseconds
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE interactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT,
+            user_message TEXT,
+            assistant_response TEXT,
+            timestamp DATETIME
+        )
+    """)
+    conn.execute(
+        "INSERT INTO interactions (user_id, user_message, assistant_response, timestamp) VALUES (?, ?, ?, ?)",
+        ("user", "hello there", "Hello!", str(stored))
+    )
+    conn.commit()
+    conn.close()
+
+    memory = BasicMemory(str(path))
+
+    with memory.get_db_connection() as conn:
+        kind, timestamp = conn.execute("SELECT typeof(timestamp), timestamp FROM interactions").fetchone()
+    assert kind == 'integer'
+    assert timestamp == int(stored.timestamp() * 1000)
+    assert memory.get_recent_interactions() == [("hello there", "Hello!", str(stored))]
+
+def test_migration_leaves_epoch_timestamps_alone(tmp_path):
+    path = tmp_path / "memory.db"
+    memory = BasicMemory(str(path))
+    _insert(memory, "hello there", "Hello!", 1_700_000_000_000)
+
+    memory = BasicMemory(str(path))
+
+    with memory.get_db_connection() as conn:
+        assert conn.execute("SELECT timestamp FROM interactions").fetchone()[0] == 1_700_000_000_000
+
+def test_recent_interactions_oldest_first(memory):
+    assert [message for message, _, _ in memory.get_recent_interactions(limit=2)] == [
+        "play some jazz", "will it rain tomorrow"
+    ]
+
+def test_search_uses_full_text_index(memory):
+    assert memory.fts_enabled
+    results = memory.search_interactions("weather")
+    # Either column may match, newest first
+    assert [message for message, _, _ in results] == ["will it rain tomorrow", "what's the weather like"]
+
+def test_search_falls_back_to_like_for_short_queries(memory):
+    # Too short for trigrams - must still find substrings
+    assert [message for message, _, _ in memory.search_interactions("ja")] == ["play some jazz"]
+
+def test_search_without_full_text_index_matches_the_same(memory):
+    with_index = memory.search_interactions("rain")
+    memory.fts_enabled = False
+    assert memory.search_interactions("rain") == with_index
+
+def test_search_query_with_quotes(memory):
+    _insert(memory, 'say "hello"', "Hello!", 4_000)
+    assert [message for message, _, _ in memory.search_interactions('"hello"')] == ['say "hello"']
+
+def test_full_text_index_covers_existing_interactions(memory):
+    # Reopening must not duplicate or drop indexed rows
+    reopened = BasicMemory(memory.db_path)
+    assert len(reopened.search_interactions("weather")) == 2
+
+def test_full_text_index_built_for_interactions_stored_before_it(tmp_path):
+    path = tmp_path / "memory.db"
+    # Interactions stored before the full-text index existed
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE interactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT,
+            user_message TEXT,
+            assistant_response TEXT,
+            timestamp INTEGER NOT NULL
+        )
+    """)
+    conn.execute(
+        "INSERT INTO interactions (user_id, user_message, assistant_response, timestamp) VALUES (?, ?, ?, ?)",
+        ("user", "what's the weather like", "Sunny.", 1_000)
+    )
+    conn.commit()
+    conn.close()
+
+    memory = BasicMemory(str(path))
+
+    assert memory.fts_enabled
+    assert [message for message, _, _ in memory.search_interactions("weather")] == ["what's the weather like"]
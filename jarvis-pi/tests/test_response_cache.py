@@ -0,0 +1,86 @@
+# tests/test_response_cache.py
+
+import pytest
+
+from assistant import response_cache
+from assistant.response_cache import ExactResponseCache, SemanticResponseCache
+
+CONTEXT = [("what's the weather like", "Sunny and 20 degrees.", "2024-11-01 10:20:30")]
+OTHER_CONTEXT = [("tell me about the moon", "The moon is 384,400 km away.", "2024-11-01 10:21:00")]
+
+@pytest.fixture
+def semantic_cache(fake_embedding_model):
+    cache = SemanticResponseCache()
+    assert cache._model_ready.wait(5)
+    return cache
+
+def test_exact_hit_needs_same_text_and_context():
+    cache = ExactResponseCache("gpt-4o-mini")
+    cache.put("will it rain tomorrow", CONTEXT, "No rain forecast.")
+
+    assert cache.get("will it rain tomorrow", CONTEXT) == "No rain forecast."
+    assert cache.get("will it rain tomorrow", OTHER_CONTEXT) is None
+    assert cache.get("will it rain tomorrow", []) is None
+    assert cache.get("will it snow tomorrow", CONTEXT) is None
+
+def test_exact_keyed_on_model():
+    ExactResponseCache("gpt-4o-mini").put("will it rain tomorrow", CONTEXT, "No rain forecast.")
+    cache = ExactResponseCache("gpt-4o")
+    assert cache.get("will it rain tomorrow", CONTEXT) is None
+
+def test_exact_skips_empty_replies():
+    cache = ExactResponseCache("gpt-4o-mini")
+    cache.put("will it rain tomorrow", CONTEXT, "")
+    assert cache.get("will it rain tomorrow", CONTEXT) is None
+
+def test_exact_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(response_cache, "MAX_EXACT_RESPONSES", 2)
+    cache = ExactResponseCache("gpt-4o-mini")
+    cache.put("first", CONTEXT, "1")
+    cache.put("second", CONTEXT, "2")
+    # A hit makes "first" the most recently used
+    assert cache.get("first", CONTEXT) == "1"
+    cache.put("third", CONTEXT, "3")
+
+    assert cache.get("second", CONTEXT) is None
+    assert cache.get("first", CONTEXT) == "1"
+    assert cache.get("third", CONTEXT) == "3"
+
+def test_semantic_hit_for_same_request_in_same_context(semantic_cache):
+    semantic_cache.put("Will it rain tomorrow in Boston", CONTEXT, "No rain forecast.")
+    # Case and spacing are normalized away
+    assert semantic_cache.get("will it   rain tomorrow in boston", CONTEXT) == "No rain forecast."
+
+def test_semantic_miss_in_other_context(semantic_cache):
+    semantic_cache.put("will it rain tomorrow in boston", CONTEXT, "No rain forecast.")
+    assert semantic_cache.get("will it rain tomorrow in boston", OTHER_CONTEXT) is None
+    assert semantic_cache.get("will it rain tomorrow in boston", []) is None
+
+def test_semantic_miss_for_dissimilar_request(semantic_cache):
+    semantic_cache.put("will it rain tomorrow in boston", CONTEXT, "No rain forecast.")
+    assert semantic_cache.get("play some jazz music please", CONTEXT) is None
+
+def test_semantic_never_caches_short_requests(semantic_cache):
+    semantic_cache.put("tell me more", CONTEXT, "More details.")
+    assert not semantic_cache.responses
+    assert semantic_cache.get("tell me more", CONTEXT) is None
+
+def test_semantic_entries_expire(semantic_cache, monkeypatch):
+    semantic_cache.put("will it rain tomorrow in boston", CONTEXT, "No rain forecast.")
+    monkeypatch.setattr(response_cache, "CACHE_TTL", -1)
+    assert semantic_cache.get("will it rain tomorrow in boston", CONTEXT) is None
+
+def test_semantic_bypassed_until_model_loads(fake_embedding_model):
+    cache = SemanticResponseCache()
+    assert cache._model_ready.wait(5)
+    cache._model_ready.clear()
+    cache.put("will it rain tomorrow in boston", CONTEXT, "No rain forecast.")
+    assert not cache.responses
+
+def test_semantic_capacity(semantic_cache, monkeypatch):
+    monkeypatch.setattr(response_cache, "MAX_CACHED_RESPONSES", 2)
+    for city in ("boston", "denver", "seattle"):
+        semantic_cache.put(f"will it rain tomorrow in {city}", CONTEXT, city)
+
+    assert semantic_cache.responses == ["denver", "seattle"]
+    assert semantic_cache.embeddings.shape[0] == len(semantic_cache.contexts) == 2
@@ -0,0 +1,118 @@
+# tests/test_semantic_memory_store.py
+
+import sqlite3
+
+import numpy as np
+import pytest
+
+from assistant.memory.ltm_stm_system import semantic_memory_store
+from assistant.memory.ltm_stm_system.semantic_memory_store import SemanticMemoryStore
+
+# Memories table as created before schema versioning
+LEGACY_SCHEMA = """
+    CREATE TABLE memories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        content TEXT NOT NULL,
+        embedding BLOB NOT NULL,
+        category TEXT,
+        timestamp TIMESTAMP,
+        metadata TEXT,
+        confidence FLOAT
+    )
+"""
+
+def _legacy_db(path, version, embedding):
+    """A database at schema `version` holding one memory with a float32 `embedding`"""
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_SCHEMA)
+    conn.execute(
+        "INSERT INTO memories (content, embedding, category, timestamp, metadata, confidence) "
+        "VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?, ?)",
+        ("user has a dog named max", embedding.astype(np.float32).tobytes(), "personal", "{}", 1.0)
+    )
+    conn.execute(f"PRAGMA user_version = {version}")
+    conn.commit()
+    conn.close()
+
+def _stored(path):
+    """(user_version, stored embedding) of the single memory in the database"""
+    conn = sqlite3.connect(path)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        blob = conn.execute("SELECT embedding FROM memories").fetchone()[0]
+    finally:
+        conn.close()
+    return version, np.frombuffer(blob, dtype=semantic_memory_store.STORED_EMBEDDING_DTYPE)
+
+def _vector(model, *values):
+    embedding = np.zeros(model.get_sentence_embedding_dimension(), dtype=np.float32)
+    embedding[:len(values)] = values
+    return embedding
+
+def test_new_database_is_created_at_current_version(tmp_path, fake_embedding_model):
+    path = tmp_path / "memory.db"
+    store = SemanticMemoryStore(str(path))
+    store.store_memory("user likes green tea", category="preferences")
+
+    version, embedding = _stored(path)
+    assert version == semantic_memory_store.SCHEMA_VERSION
+    assert len(embedding) == fake_embedding_model.get_sentence_embedding_dimension()
+    assert np.linalg.norm(embedding.astype(np.float32)) == pytest.approx(1.0, abs=1e-3)
+
+def test_migrates_unversioned_embeddings_to_normalized_float16(tmp_path, fake_embedding_model):
+    path = tmp_path / "memory.db"
+    _legacy_db(path, 0, _vector(fake_embedding_model, 3.0, 4.0))
+
+    SemanticMemoryStore(str(path))
+
+    version, embedding = _stored(path)
+    assert version == semantic_memory_store.SCHEMA_VERSION
+    assert embedding.dtype == np.float16
+    np.testing.assert_allclose(embedding[:3], [0.6, 0.8, 0.0], atol=1e-3)
+
+def test_migrates_version_1_embeddings_to_float16_only(tmp_path, fake_embedding_model):
+    path = tmp_path / "memory.db"
+    # Version 1 embeddings are already normalized - they must only be converted, not normalized again
+    _legacy_db(path, 1, _vector(fake_embedding_model, 3.0, 4.0))
+
+    SemanticMemoryStore(str(path))
+
+    version, embedding = _stored(path)
+    assert version == semantic_memory_store.SCHEMA_VERSION
+    assert embedding.dtype == np.float16
+    np.testing.assert_allclose(embedding[:3], [3.0, 4.0, 0.0])
+
+def test_current_database_is_left_untouched(tmp_path, fake_embedding_model):
+    path = tmp_path / "memory.db"
+    SemanticMemoryStore(str(path)).store_memory("user likes green tea")
+    _, before = _stored(path)
+
+    SemanticMemoryStore(str(path))
+
+    version, after = _stored(path)
+    assert version == semantic_memory_store.SCHEMA_VERSION
+    np.testing.assert_array_equal(before, after)
+
+def test_migrated_memories_are_searchable(tmp_path, fake_embedding_model):
+    path = tmp_path / "memory.db"
+    _legacy_db(path, 0, fake_embedding_model.encode("user has a dog named max") * 5)
+
+    store = SemanticMemoryStore(str(path))
+    results = store.search_memories("user has a dog named max", min_similarity=0.9)
+
+    assert [result['content'] for result in results] == ["user has a dog named max"]
+    assert results[0]['relevance'] == pytest.approx(1.0, abs=1e-2)
+
+def test_search_sees_memories_stored_after_loading(tmp_path, fake_embedding_model):
+    store = SemanticMemoryStore(str(tmp_path / "memory.db"))
+    store.store_memory("user has a dog named max", category="personal")
+    assert store.search_memories("dog named max", min_similarity=0.1)
+
+    store.batch_store_memories([
+        {'content': "user is allergic to peanuts", 'category': "health"},
+        {'content': "user has a cat named tom", 'category': "personal"},
+    ])
+
+    results = store.search_memories("user is allergic to peanuts", min_similarity=0.1, category="health")
+    assert [result['content'] for result in results] == ["user is allergic to peanuts"]
+    assert len(store.search_memories("user has a", min_similarity=0.0, limit=10)) == 3